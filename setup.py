@@ -14,7 +14,12 @@ setup(
     license="MIT license",
     python_requires=">=3.9",
     install_requires=["django (>=4.2)"],
-    packages=["widget_tweaks", "widget_tweaks.templatetags"],
+    packages=[
+        "widget_tweaks",
+        "widget_tweaks.templatetags",
+        "widget_tweaks.management",
+        "widget_tweaks.management.commands",
+    ],
     classifiers=[
         "Development Status :: 5 - Production/Stable",
         "Framework :: Django",
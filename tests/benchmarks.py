@@ -0,0 +1,219 @@
+"""
+Benchmarks for widget_tweaks filters and tags.
+
+Run from the source checkout::
+
+    python -m tests.benchmarks
+    python -m tests.benchmarks --json results.json
+    python -m tests.benchmarks --compare results.json
+
+Results are printed as a table and can be written as JSON, so that runs
+can be compared with ``--compare``.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import timeit
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "tests.settings")
+django.setup()
+
+# pylint: disable=wrong-import-position
+from django import forms  # noqa: E402
+from django.forms import formset_factory  # noqa: E402
+from django.template import Context, Template  # noqa: E402
+
+import widget_tweaks  # noqa: E402
+from widget_tweaks.templatetags import widget_tweaks as tags  # noqa: E402
+
+from .forms import MyForm  # noqa: E402
+
+LOAD = "{% load widget_tweaks %}"
+
+
+LargeForm = type(
+    "LargeForm",
+    (forms.Form,),
+    {f"field_{i}": forms.CharField(required=i % 2 == 0) for i in range(60)},
+)
+
+
+def _chain(depth):
+    filters = "".join(f'|attr:"data-a{i}:{i}"' for i in range(depth))
+    return Template(LOAD + "{{ form.simple" + filters + " }}")
+
+
+def _render(template, **context):
+    return lambda: template.render(Context(context))
+
+
+def _compile(text):
+    def compile_template():
+        # measure parsing, not hits of the render_field parse cache
+        cache_clear = getattr(tags.compile_render_field_cached, "cache_clear", None)
+        if cache_clear is not None:
+            cache_clear()
+        return Template(text)
+
+    return compile_template
+
+
+def get_benchmarks():
+    """
+    Return a dict of benchmark name -> callable.
+    """
+    form = MyForm()
+    large_form = LargeForm()
+    formset = formset_factory(MyForm, extra=200)()
+    benchmarks = {
+        "filter_attr": _render(
+            Template(LOAD + '{{ form.simple|attr:"foo:bar" }}'), form=form
+        ),
+        "filter_add_class": _render(
+            Template(LOAD + '{{ form.with_cls|add_class:"foo" }}'), form=form
+        ),
+        "filter_chain_1": _render(_chain(1), form=form),
+        "filter_chain_5": _render(_chain(5), form=form),
+        "filter_chain_10": _render(_chain(10), form=form),
+        "filter_data_attrs_15": _render(
+            Template(
+                LOAD
+                + "{{ form.simple"
+                + "".join(f'|set_data:"a{i}:v{i}"' for i in range(15))
+                + " }}"
+            ),
+            form=form,
+        ),
+        "render_field_plain": _render(
+            Template(LOAD + "{% render_field form.simple %}"), form=form
+        ),
+        "render_field_literal": _render(
+            Template(
+                LOAD + '{% render_field form.simple class="form-control" '
+                'placeholder="Name" data-foo="bar" %}'
+            ),
+            form=form,
+        ),
+        "render_field_dynamic": _render(
+            Template(
+                LOAD + "{% render_field form.simple class=cls "
+                "placeholder=form.simple.label %}"
+            ),
+            form=form,
+            cls="form-control",
+        ),
+        "render_field_select": _render(
+            Template(LOAD + '{% render_field form.choice class="form-select" %}'),
+            form=form,
+        ),
+        "render_field_large_form": _render(
+            Template(
+                LOAD + "{% for field in form %}"
+                '{% render_field field class+="form-control" %}{% endfor %}'
+            ),
+            form=large_form,
+            WIDGET_REQUIRED_CLASS="required",
+        ),
+        "render_fields_large_form": _render(
+            Template(
+                LOAD + '{% render_fields form class+="form-control" %}'
+                "{% endrender_fields %}"
+            ),
+            form=large_form,
+            WIDGET_REQUIRED_CLASS="required",
+        ),
+        "render_field_formset": _render(
+            Template(
+                LOAD + "{% for form in formset %}"
+                '{% render_field form.simple class="form-control" %}{% endfor %}'
+            ),
+            formset=formset,
+        ),
+        "compile_render_field": _compile(
+            LOAD
+            + "".join(
+                f'{{% render_field form.simple class="form-control" data-i="{i}" '
+                "placeholder=form.simple.label %}"
+                for i in range(20)
+            )
+        ),
+        "compile_filter_chain": _compile(
+            LOAD + '{{ form.simple|add_class:"a"|attr:"foo:bar"|set_data:"x:1" }}' * 20
+        ),
+    }
+    return benchmarks
+
+
+def run(benchmarks, number, repeat, only=None):
+    results = {}
+    for name, func in benchmarks.items():
+        if only and not any(pattern in name for pattern in only):
+            continue
+        timings = [
+            t / number for t in timeit.repeat(func, number=number, repeat=repeat)
+        ]
+        results[name] = {
+            "min": min(timings),
+            "mean": statistics.mean(timings),
+            "stdev": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+            "number": number,
+            "repeat": repeat,
+        }
+    return results
+
+
+def metadata():
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "django": django.get_version(),
+        "widget_tweaks": widget_tweaks.__version__,
+    }
+
+
+def print_results(results, baseline=None):
+    header = f"{'benchmark':<28} {'min (us)':>12} {'mean (us)':>12} {'stdev':>10}"
+    if baseline:
+        header += f" {'baseline':>12} {'change':>8}"
+    print(header)
+    print("-" * len(header))
+    for name, result in results.items():
+        line = (
+            f"{name:<28} {result['min'] * 1e6:>12.2f} "
+            f"{result['mean'] * 1e6:>12.2f} {result['stdev'] * 1e6:>10.2f}"
+        )
+        if baseline and name in baseline:
+            base = baseline[name]["min"]
+            line += f" {base * 1e6:>12.2f} {(result['min'] - base) / base:>+8.1%}"
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-n", "--number", type=int, default=200)
+    parser.add_argument("-r", "--repeat", type=int, default=5)
+    parser.add_argument("-k", "--only", action="append", help="name substring")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--compare", help="JSON results of a previous run")
+    args = parser.parse_args(argv)
+
+    results = run(get_benchmarks(), args.number, args.repeat, args.only)
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fp:
+            baseline = json.load(fp)["results"]
+    print_results(results, baseline)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fp:
+            json.dump({"meta": metadata(), "results": results}, fp, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
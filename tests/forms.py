@@ -84,3 +84,25 @@ def render_field_from_tag(field, *attributes):
     tpl = string.Template("{% render_field form.$field$attrs %}")
     render_field_str = tpl.substitute(field=field, attrs="".join(attr_strings))
     return render_form(render_field_str)
+
+
+class ChoicesForm(Form):
+    """
+    Form with select widgets used to test streaming rendering.
+    """
+
+    plain = forms.ChoiceField(choices=[(i, f"Option {i}") for i in range(10)])
+    grouped = forms.ChoiceField(
+        choices=[
+            ("Group <1>", [(1, "one"), (2, "two")]),
+            (3, "three"),
+            ("Group 2", [(4, "four & more")]),
+        ]
+    )
+    multiple = forms.MultipleChoiceField(
+        choices=[(i, f"Option {i}") for i in range(5)],
+        initial=[1, 3],
+    )
+    radio = forms.ChoiceField(
+        choices=[(1, "one"), (2, "two")], widget=forms.RadioSelect
+    )
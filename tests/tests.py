@@ -1,4 +1,27 @@
-from unittest import TestCase
+import asyncio
+import gc
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from copy import copy
+from io import StringIO
+from unittest import TestCase, skipIf
+
+from django import forms
+from django.core.management import CommandError, call_command
+from django.forms import formset_factory
+from django.forms.renderers import DjangoTemplates, TemplatesSetting
+from django.template import Context, Engine, Template, TemplateSyntaxError
+from django.template.base import VariableNode
+from django.test import override_settings
+from django.utils.safestring import SafeData, mark_safe
+
+try:
+    import jinja2
+except ImportError:
+    jinja2 = None
+
+from widget_tweaks import cache, defaults, loaders, signals, warmup
+from widget_tweaks.templatetags import widget_tweaks
 
 from .forms import (
     render_field,
@@ -6,6 +29,7 @@ from .forms import (
     render_field_from_tag,
     render_form,
     MyForm,
+    ChoicesForm,
 )
 
 
@@ -444,3 +468,1387 @@ class RadioFieldTest(TestCase):
         self.assertEqual(res.count("id_2"), 1)
         self.assertEqual(res.count("c_1"), 1)
         self.assertEqual(res.count("c_2"), 1)
+
+
+class AttrSpecCacheTest(TestCase):
+    def test_parse_attr_spec(self):
+        self.assertEqual(widget_tweaks.parse_attr_spec("foo:bar"), ("foo", "bar"))
+        self.assertEqual(widget_tweaks.parse_attr_spec("foo"), ("foo", True))
+        self.assertEqual(
+            widget_tweaks.parse_attr_spec("v-bind::class:a:b"), ("v-bind:class", "a:b")
+        )
+
+    def test_spec_is_cached(self):
+        widget_tweaks.parse_attr_spec.cache_clear()
+        render_field("simple", "attr", "foo:bar")
+        render_field("with_cls", "attr", "foo:bar")
+        info = widget_tweaks.parse_attr_spec.cache_info()
+        self.assertEqual(info.misses, 1)
+        self.assertEqual(info.hits, 1)
+
+    def test_cache_size_setting(self):
+        with override_settings(WIDGET_TWEAKS_ATTR_SPEC_CACHE_SIZE=1):
+            self.assertEqual(widget_tweaks.parse_attr_spec.cache_info().maxsize, 1)
+        with override_settings(WIDGET_TWEAKS_ATTR_SPEC_CACHE_SIZE=0):
+            self.assertFalse(hasattr(widget_tweaks.parse_attr_spec, "cache_info"))
+            res = render_field("simple", "attr", "foo:bar")
+            assertIn('foo="bar"', res)
+
+
+class RenderFieldParseCacheTest(TestCase):
+    def test_identical_tags_are_parsed_once(self):
+        widget_tweaks.compile_render_field_cached.cache_clear()
+        template = Template(
+            "{% load widget_tweaks %}"
+            + '{% render_field form.simple class="a" placeholder=form.simple.label %}'
+            * 3
+        )
+        info = widget_tweaks.compile_render_field_cached.cache_info()
+        self.assertEqual(info.misses, 1)
+        self.assertEqual(info.hits, 2)
+        nodes = template.nodelist.get_nodes_by_type(widget_tweaks.FieldAttributeNode)
+        self.assertEqual(len(nodes), 3)
+        self.assertIs(nodes[0].plan, nodes[2].plan)
+        res = template.render(Context({"form": MyForm()}))
+        self.assertEqual(res.count('class="a"'), 3)
+        self.assertEqual(res.count('placeholder="Simple"'), 3)
+
+    def test_tags_with_filters_are_not_cached(self):
+        widget_tweaks.compile_render_field_cached.cache_clear()
+        res = render_form("{% render_field form.simple foo=form.simple.label|upper %}")
+        assertIn('foo="SIMPLE"', res)
+        info = widget_tweaks.compile_render_field_cached.cache_info()
+        self.assertEqual(info.misses + info.hits, 0)
+
+    def test_filter_after_quoted_value(self):
+        res = render_form('{% render_field form.simple foo="bar"|upper %}')
+        assertIn('foo="BAR"', res)
+
+    def test_quotes_in_quoted_values(self):
+        res = render_form(
+            """{% render_field form.simple placeholder='it"s' title="it's" %}"""
+        )
+        assertIn('placeholder="it&quot;s"', res)
+        assertIn('title="it&#x27;s"', res)
+
+    def test_invalid_attribute(self):
+        for tag in (
+            "{% render_field %}",
+            '{% render_field form.simple ="bar" %}',
+            '{% render_field form.simple +="bar" %}',
+            '{% render_field form.simple f!oo="bar" %}',
+            "{% render_field form.simple foo %}",
+        ):
+            with self.subTest(tag=tag):
+                self.assertRaises(TemplateSyntaxError, render_form, tag)
+
+    def test_cache_size_setting(self):
+        with override_settings(WIDGET_TWEAKS_PARSE_CACHE_SIZE=0):
+            self.assertFalse(
+                hasattr(widget_tweaks.compile_render_field_cached, "cache_info")
+            )
+            res = render_form('{% render_field form.simple foo="bar" %}')
+            assertIn('foo="bar"', res)
+
+
+class FilterChainTest(TestCase):
+    def test_proxy_is_slotted(self):
+        form = MyForm()
+        field = widget_tweaks.add_class(form["simple"], "a")
+        self.assertNotIn("__dict__", vars(widget_tweaks.TweakedField))
+        self.assertIs(field.form, form)
+        with self.assertRaises(AttributeError):
+            field.extra = 1
+        proxy = copy(field)
+        self.assertIs(proxy._field, field._field)
+        self.assertEqual(str(proxy), str(field))
+
+    def test_chain_builds_single_proxy(self):
+        form = MyForm()
+        field = widget_tweaks.set_data(
+            widget_tweaks.set_attr(widget_tweaks.add_class(form["simple"], "a"), "b:c"),
+            "x:1",
+        )
+        self.assertIsInstance(field, widget_tweaks.TweakedField)
+        self.assertIs(field._field, form["simple"])
+        self.assertEqual(len(field._operations), 3)
+        res = str(field)
+        assertIn('class="a"', res)
+        assertIn('b="c"', res)
+        assertIn('data-x="1"', res)
+
+    def test_chain_branches_are_independent(self):
+        res = render_form(
+            '{% with f=form.simple|add_class:"a" %}'
+            '{{ f|attr:"foo:bar" }}|{{ f|attr:"egg:spam" }}|{{ f }}'
+            "{% endwith %}"
+        )
+        first, second, third = res.split("|")
+        assertIn('foo="bar"', first)
+        assertNotIn("egg", first)
+        assertIn('egg="spam"', second)
+        assertNotIn("foo", second)
+        assertIn('class="a"', third)
+        assertNotIn("foo", third)
+
+    def test_proxy_renders_repeatedly(self):
+        res = render_form(
+            '{% with f=form.simple|attr:"foo:bar" %}{{ f }}{{ f }}{% endwith %}'
+        )
+        self.assertEqual(res.count('foo="bar"'), 2)
+
+    def test_proxy_can_be_copied(self):
+        field = widget_tweaks.set_attr(MyForm()["simple"], "foo:bar")
+        self.assertEqual(str(copy(field)), str(field))
+
+    def test_proxy_delegates_to_field(self):
+        res = render_form(
+            '{% with f=form.simple|attr:"foo:bar" %}'
+            "{{ f.name }} {{ f.label }} {{ f|field_type }}"
+            "{% endwith %}"
+        )
+        self.assertEqual(res, "simple Simple charfield")
+
+    def test_bound_field_rendering_methods(self):
+        field = widget_tweaks.add_class(MyForm()["simple"], "x")
+        assertIn('class="x"', field.as_text())
+        assertIn('class="x"', field.as_textarea())
+        assertIn('class="x"', field.as_hidden())
+
+    @skipIf(not hasattr(forms.BoundField, "as_field_group"), "Django < 5.0")
+    def test_as_field_group(self):
+        res = render_form(
+            '{% with f=form.simple|add_class:"x" %}{{ f.as_field_group }}{% endwith %}'
+        )
+        assertIn("<label", res)
+        assertIn('class="x"', res)
+
+
+class RenderFieldTagPlanTest(TestCase):
+    def _node(self, text):
+        tpl = Template("{% load widget_tweaks %}" + text)
+        return tpl.nodelist.get_nodes_by_type(widget_tweaks.FieldAttributeNode)[0]
+
+    def test_plan_splits_literal_and_dynamic_values(self):
+        node = self._node(
+            '{% render_field form.simple foo="bar" rows=20 title=form.simple.label '
+            'class+="a" class+=cls %}'
+        )
+        self.assertEqual(node.plan.static_set_attrs, {"foo": "bar", "rows": "20"})
+        self.assertEqual([attr for attr, _ in node.plan.dynamic_set_attrs], ["title"])
+        self.assertEqual(node.plan.append_plan[0], ("class", "a", None))
+        self.assertEqual(node.plan.append_plan[1][:2], ("class", None))
+
+    def test_literal_tag_is_precomputed(self):
+        node = self._node('{% render_field form.simple foo="bar" rows=20 class+="a" %}')
+        self.assertIsNotNone(node.plan.static_operations)
+        _, _, values = node.plan.static_operations[0]
+        self.assertEqual(dict(values), {"foo": "bar", "rows": "20"})
+        with self.assertRaises(TypeError):
+            values["foo"] = "baz"
+        res = render_form('{% render_field form.simple foo="bar" class+="a" %}')
+        assertIn('foo="bar"', res)
+        assertIn('class="a"', res)
+
+    def test_dynamic_tag_is_not_precomputed(self):
+        node = self._node("{% render_field form.simple foo=bar %}")
+        self.assertIsNone(node.plan.static_operations)
+        node = self._node("{% render_field form.simple foo=bar|upper %}")
+        self.assertIsNone(node.plan.static_operations)
+
+    def test_first_assignment_wins(self):
+        res = render_form('{% render_field form.simple foo="bar" foo="baz" %}')
+        assertIn('foo="bar"', res)
+        assertNotIn("baz", res)
+
+    def test_colon_in_attribute_name(self):
+        res = render_form('{% render_field form.simple x-on:click="open=true" %}')
+        assertIn('x-on:click="open=true"', res)
+
+    def test_colons_in_dynamic_value(self):
+        res = render_form("{% render_field form.simple title=title %}", title="::a:b")
+        assertIn('title="::a:b"', res)
+
+    def test_dynamic_append(self):
+        res = render_form("{% render_field form.with_cls class+=cls %}", cls="class1")
+        assertIn('class="class0 class1"', res)
+
+    def test_dynamic_values_are_escaped(self):
+        res = render_form(
+            """{% render_field form.simple a="A&B"|lower b=safe c='say "hi"'|lower """
+            """class+=safe %}""",
+            safe=mark_safe('a"b'),
+        )
+        assertIn('a="a&amp;b"', res)
+        assertIn('b="a&quot;b"', res)
+        assertIn('c="say &quot;hi&quot;"', res)
+        assertIn('class="a&quot;b"', res)
+
+    def test_literal_values_are_escaped(self):
+        res = render_form(
+            """{% render_field form.simple placeholder='a & <b> "c"' class+="<x>" %}"""
+        )
+        assertIn('placeholder="a &amp; &lt;b&gt; &quot;c&quot;"', res)
+        assertIn('class="&lt;x&gt;"', res)
+        self.assertEqual(
+            res,
+            render_form(
+                """{{ form.simple|attr:'placeholder:a & <b> "c"'|add_class:"<x>" }}"""
+            ),
+        )
+
+
+class WidgetOverlayTest(TestCase):
+    def test_type_change_does_not_leak(self):
+        form = MyForm()
+        res = render_form(
+            '{% render_field form.simple type="date" %}|{{ form.simple|attr:"type:search" }}'
+            "|{{ form.simple }}",
+            form=form,
+        )
+        first, second, third = res.split("|")
+        assertIn('type="date"', first)
+        assertIn('type="search"', second)
+        assertIn('type="text"', third)
+        self.assertEqual(form.fields["simple"].widget.input_type, "text")
+
+    def test_remove_attr_does_not_leak(self):
+        form = MyForm()
+        res = render_form(
+            '{{ form.with_attrs|remove_attr:"foo" }}|{{ form.with_attrs }}', form=form
+        )
+        first, second = res.split("|")
+        assertNotIn("foo", first)
+        assertIn('egg="spam"', first)
+        assertIn('foo="baz"', second)
+        self.assertEqual(
+            form.fields["with_attrs"].widget.attrs, {"foo": "baz", "egg": "spam"}
+        )
+
+    def test_remove_attr_with_append(self):
+        res = render_field("with_cls", "append_attr", "class:x", "remove_attr", "class")
+        assertIn('class="x"', res)
+        assertNotIn("class0", res)
+
+    def test_remove_attr_subwidget(self):
+        res = render_form('{{ form.radio.0|attr:"foo:bar"|remove_attr:"id" }}')
+        assertIn('foo="bar"', res)
+        assertNotIn("id=", res)
+
+
+class ClassListTest(TestCase):
+    def test_add_class_dedupes(self):
+        res = render_field(
+            "with_cls", "add_class", "class1", "add_class", "class0 class1"
+        )
+        assertIn('class="class0 class1"', res)
+
+    def test_render_field_append_dedupes(self):
+        res = render_field_from_tag("with_cls", 'class+="class0"', 'class+="a a"')
+        assertIn('class="class0 a"', res)
+
+    def test_other_attributes_are_not_deduped(self):
+        res = render_field("with_attrs", "append_attr", "foo:baz")
+        assertIn('foo="baz baz"', res)
+
+    def test_remove_class(self):
+        res = render_field("with_cls", "remove_class", "class0", "add_class", "a")
+        assertIn('class="a"', res)
+        assertNotIn("class0", res)
+
+    def test_remove_class_leftmost_wins(self):
+        res = render_field("simple", "add_class", "a", "remove_class", "a")
+        assertIn('class="a"', res)
+        res = render_field("simple", "remove_class", "a", "add_class", "a")
+        assertNotIn("class=", res)
+
+    def test_remove_last_class(self):
+        form = MyForm()
+        res = render_field("with_cls", "remove_class", "class0", form=form)
+        assertNotIn("class=", res)
+        self.assertEqual(form.fields["with_cls"].widget.attrs, {"class": "class0"})
+
+    def test_remove_class_subwidget(self):
+        res = render_form('{{ form.radio.0|remove_class:"b"|add_class:"a b" }}')
+        assertIn('class="a"', res)
+
+    def test_class_list(self):
+        classes = widget_tweaks.ClassList("a b")
+        classes.add("b c")
+        classes.remove("a")
+        self.assertIn("c", classes)
+        self.assertEqual(list(classes), ["b", "c"])
+        self.assertEqual(str(classes), "b c")
+
+
+class DefaultAttrsTest(TestCase):
+    def setUp(self):
+        settings = override_settings(
+            WIDGET_TWEAKS_DEFAULT_ATTRS={
+                "django.forms.TextInput": {"class": "form-control", "foo": "default"},
+                forms.Select: {"class": "form-select"},
+                "django.forms.ChoiceField": {"data-choice": "1"},
+            }
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_render_field(self):
+        res = render_form("{% render_field form.simple %}")
+        assertIn('class="form-control"', res)
+        assertIn('foo="default"', res)
+
+    def test_filters(self):
+        res = render_field("simple", "add_class", "a")
+        assertIn('class="form-control a"', res)
+
+    def test_template_attributes_win(self):
+        res = render_form(
+            '{% render_field form.simple foo="bar" class+="form-control" %}'
+        )
+        assertIn('foo="bar"', res)
+        assertIn('class="form-control"', res)
+
+    def test_widget_attributes_win(self):
+        res = render_form("{% render_field form.with_attrs %}")
+        assertIn('foo="baz"', res)
+        assertNotIn('foo="default"', res)
+        res = render_form("{% render_field form.with_cls %}")
+        assertIn('class="class0 form-control"', res)
+
+    def test_subclasses_and_field_classes(self):
+        res = render_form("{% render_field form.choice %}")
+        assertIn('class="form-select"', res)
+        assertIn('data-choice="1"', res)
+        res = render_form("{% render_field form.radio %}")
+        assertNotIn("form-select", res)
+        assertIn('data-choice="1"', res)
+
+    def test_remove_attr(self):
+        res = render_field("simple", "remove_attr", "class")
+        assertNotIn("class=", res)
+        assertIn('foo="default"', res)
+
+    def test_remove_class(self):
+        res = render_field("simple", "remove_class", "form-control")
+        assertNotIn("class=", res)
+
+    def test_untweaked_field(self):
+        res = render_form("{{ form.simple }}")
+        assertNotIn("form-control", res)
+
+    def test_table(self):
+        form = MyForm()
+        table = defaults.get_default_attrs()
+        field = form.fields["with_cls"]
+        self.assertIs(
+            table.get(field, field.widget),
+            table.get(form.fields["simple"], form.fields["simple"].widget),
+        )
+
+    def test_disabled(self):
+        with override_settings(WIDGET_TWEAKS_DEFAULT_ATTRS={}):
+            self.assertIsNone(defaults.get_default_attrs())
+            res = render_form("{% render_field form.simple %}")
+            assertNotIn("class=", res)
+
+
+class SubwidgetTargetingTest(TestCase):
+    def test_multiwidget_by_index_and_name(self):
+        res = render_form(
+            '{% render_field form.date class="outer" subwidget.year.class="y" '
+            'subwidget.0.class+="m" subwidget.day.egg="ham" %}'
+        )
+        assertIn('name="date_month" class="outer m"', res)
+        assertIn(
+            'name="date_day" class="outer" required id="id_date_day" egg="ham"', res
+        )
+        assertIn('name="date_year" class="y"', res)
+
+    def test_choice_options_by_index(self):
+        res = render_form(
+            '{% render_field form.radio subwidget.1.class+="b" %}'
+            '{{ form.grouped|attr:"subwidget.0_1.class:x"|add_class:"sel" }}',
+            form=ChoicesForm(),
+        )
+        assertIn('value="1" required id="id_radio_0">', res)
+        assertIn('value="2" required id="id_radio_1" class="b">', res)
+        assertIn('<select name="grouped" class="sel" id="id_grouped">', res)
+        assertIn('<option value="1">one</option>', res)
+        assertIn('<option value="2" class="x">two</option>', res)
+
+    def test_remove_attr(self):
+        res = render_field(
+            "date", "remove_attr", "subwidget.month.egg", "attr", "subwidget.day.a"
+        )
+        assertIn('name="date_month" required id="id_date_month">', res)
+        assertIn('name="date_day" required id="id_date_day" egg="spam" a>', res)
+
+    def test_widget_is_not_modified(self):
+        form = MyForm()
+        widget = form.fields["date"].widget
+        render_field("date", "attr", "subwidget.0.foo:bar", form=form)
+        self.assertNotIn("get_context", vars(widget))
+        assertNotIn('foo="bar"', str(form["date"]))
+
+    def test_streaming(self):
+        field = widget_tweaks.set_attr(ChoicesForm()["plain"], "subwidget.3.class:x")
+        html = "".join(widget_tweaks.iter_field_html(field, chunk_size=2))
+        self.assertEqual(html, str(field))
+        assertIn('<option value="3" class="x">', html)
+
+    def test_options_cache(self):
+        with override_settings(WIDGET_TWEAKS_OPTIONS_CACHE=True):
+            res = render_form(
+                '{% render_field form.plain subwidget.3.class="x" %}',
+                form=ChoicesForm(),
+            )
+        assertIn('<option value="3" class="x">', res)
+
+    def test_invalid_target(self):
+        self.assertRaises(
+            TemplateSyntaxError,
+            render_form,
+            '{% render_field form.date subwidget.0="x" %}',
+        )
+
+
+class InputSerializerTest(TestCase):
+    def assertSameAsTemplates(self, field):
+        widget, attrs = field._widget_attrs(None, None)
+        self.assertEqual(str(field), field._field.as_widget(widget, attrs))
+
+    def test_input_widgets(self):
+        class InputsForm(forms.Form):
+            text = forms.CharField(initial='a "quoted" <value>')
+            number = forms.IntegerField(initial=5, localize=True)
+            email = forms.EmailField(disabled=True)
+            password = forms.CharField(
+                widget=forms.PasswordInput(render_value=True), initial="p&ss"
+            )
+            hidden = forms.CharField(widget=forms.HiddenInput, initial="h")
+            date = forms.DateField(initial="2020-01-01")
+            checkbox = forms.BooleanField(initial=True)
+            file = forms.FileField(required=False)
+
+        for form in (InputsForm(), InputsForm({"text": "<b>", "number": "x"})):
+            for name in form.fields:
+                with self.subTest(name=name, bound=form.is_bound):
+                    field = widget_tweaks.set_attr(
+                        widget_tweaks.append_attr(
+                            widget_tweaks.set_data(form[name], "x:<&>"),
+                            "class:a&b",
+                        ),
+                        "autofocus",
+                    )
+                    self.assertSameAsTemplates(field)
+
+    def test_render_field_values(self):
+        res = render_form(
+            '{% render_field form.with_attrs a="<b>" b=1 c=dynamic d=safe %}',
+            dynamic='"<i>"',
+            safe=mark_safe("<i>"),
+        )
+        assertIn('a="&lt;b&gt;" b="1" c="&quot;&lt;i&gt;&quot;" d="&lt;i&gt;"', res)
+
+    def test_tuple_values(self):
+        class TupleForm(forms.Form):
+            pair = forms.CharField(
+                widget=forms.TextInput(attrs={"data-t": (1, "<2>"), "data-u": (3,)})
+            )
+
+        field = widget_tweaks.add_class(TupleForm()["pair"], "x")
+        self.assertSameAsTemplates(field)
+        assertIn('data-t="(1, &#x27;&lt;2&gt;&#x27;)" data-u="(3,)"', str(field))
+
+    def test_literal_values_are_pre_escaped(self):
+        node = Template(
+            '{% load widget_tweaks %}{% render_field form.simple a=1 b="x" c="<y>" %}'
+        ).nodelist[-1]
+        values = node.plan.static_set_attrs
+        self.assertIsInstance(values["a"], SafeData)
+        self.assertIsInstance(values["b"], SafeData)
+        # values changed by escaping are escaped on render
+        self.assertNotIsInstance(values["c"], SafeData)
+        assertIn('c="&lt;y&gt;"', node.render(Context({"form": MyForm()})))
+
+    def test_fallback_to_templates(self):
+        form = MyForm()
+        form.fields["simple"].widget.template_name = "custom.html"
+        self.assertFalse(
+            widget_tweaks._has_builtin_input_template(
+                form.fields["simple"].widget, form.renderer
+            )
+        )
+        self.assertFalse(
+            widget_tweaks._has_builtin_input_template(
+                form.fields["with_cls"].widget, TemplatesSetting()
+            )
+        )
+
+    def test_overridden_render_methods(self):
+        class IconInput(forms.TextInput):
+            def render(self, name, value, attrs=None, renderer=None):
+                html = super().render(name, value, attrs, renderer)
+                return mark_safe(f'<span class="icon">{html}</span>')
+
+        class WrappedBoundField(forms.BoundField):
+            def as_widget(self, widget=None, attrs=None, only_initial=False):
+                html = super().as_widget(widget, attrs, only_initial)
+                return mark_safe(f"<div>{html}</div>")
+
+        class WrappedField(forms.CharField):
+            def get_bound_field(self, form, field_name):
+                return WrappedBoundField(form, self, field_name)
+
+        class OverridesForm(forms.Form):
+            icon = forms.CharField(widget=IconInput)
+            wrapped = WrappedField()
+
+        form = OverridesForm()
+        icon = str(widget_tweaks.add_class(form["icon"], "x"))
+        self.assertTrue(icon.startswith('<span class="icon"><input'))
+        assertIn('class="x"', icon)
+        wrapped = render_form('{% render_field form.wrapped class="x" %}', form=form)
+        self.assertTrue(wrapped.startswith("<div><input"))
+        assertIn('class="x"', wrapped)
+
+    def test_renderers_are_not_kept_alive(self):
+        renderer = DjangoTemplates()
+        form = MyForm(renderer=renderer)
+        str(widget_tweaks.add_class(form["simple"], "x"))
+        self.assertIn(renderer, widget_tweaks._builtin_input_templates)
+        count = len(widget_tweaks._builtin_input_templates)
+        del form, renderer
+        gc.collect()
+        self.assertEqual(len(widget_tweaks._builtin_input_templates), count - 1)
+
+
+class RenderCacheTest(TestCase):
+    def test_disabled_by_default(self):
+        self.assertIsNone(cache.get_render_cache())
+        self.assertIsNone(cache.render_cache_info())
+
+    def test_hits_and_misses(self):
+        with override_settings(WIDGET_TWEAKS_RENDER_CACHE=True):
+            first = render_field("simple", "attr", "foo:bar")
+            second = render_field("simple", "attr", "foo:bar")
+            other = render_form('{% render_field form.simple foo="baz" %}')
+            info = cache.render_cache_info()
+        self.assertEqual(first, second)
+        assertIn('foo="baz"', other)
+        self.assertEqual((info.hits, info.misses, info.currsize), (1, 2, 2))
+
+    def test_bound_form_is_not_cached(self):
+        with override_settings(WIDGET_TWEAKS_RENDER_CACHE=True):
+            render_field("simple", "attr", "foo:bar", form=MyForm({}))
+            info = cache.render_cache_info()
+        self.assertEqual((info.hits, info.misses, info.currsize), (0, 0, 0))
+
+    def test_initial_value_is_part_of_key(self):
+        with override_settings(WIDGET_TWEAKS_RENDER_CACHE=True):
+            render_field(
+                "simple", "attr", "foo:bar", form=MyForm(initial={"simple": 1})
+            )
+            res = render_field(
+                "simple", "attr", "foo:bar", form=MyForm(initial={"simple": 2})
+            )
+            info = cache.render_cache_info()
+        assertIn('value="2"', res)
+        self.assertEqual(info.misses, 2)
+
+    def test_field_and_widget_state_is_part_of_key(self):
+        with_help_text = MyForm()
+        with_help_text.fields["simple"].help_text = "Help"
+        with_template = MyForm()
+        with_template.fields["simple"].widget.template_name = "custom.html"
+        with override_settings(WIDGET_TWEAKS_RENDER_CACHE=True):
+            keys = {
+                cache.render_cache_key(form["simple"], ())
+                for form in (MyForm(), with_help_text, with_template)
+            }
+            render_field("simple", "attr", "foo:bar")
+            res = render_field("simple", "attr", "foo:bar", form=with_help_text)
+        self.assertEqual(len(keys), 3)
+        self.assertEqual(
+            res, str(widget_tweaks.set_attr(with_help_text["simple"], "foo:bar"))
+        )
+
+    def test_lru_eviction(self):
+        with override_settings(
+            WIDGET_TWEAKS_RENDER_CACHE=True, WIDGET_TWEAKS_RENDER_CACHE_SIZE=1
+        ):
+            render_field("simple", "attr", "foo:bar")
+            render_field("with_cls", "attr", "foo:bar")
+            render_field("simple", "attr", "foo:bar")
+            info = cache.render_cache_info()
+        self.assertEqual((info.hits, info.misses, info.currsize), (0, 3, 1))
+
+    def test_cache_backend(self):
+        with override_settings(
+            WIDGET_TWEAKS_RENDER_CACHE=True,
+            WIDGET_TWEAKS_RENDER_CACHE_BACKEND="default",
+        ):
+            render_field("simple", "attr", "foo:backend")
+            res = render_field("simple", "attr", "foo:backend")
+            info = cache.render_cache_info()
+        assertIn('foo="backend"', res)
+        self.assertEqual((info.hits, info.misses), (1, 1))
+
+
+class OptionsCacheTest(TestCase):
+    def setUp(self):
+        settings = override_settings(WIDGET_TWEAKS_OPTIONS_CACHE=True)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_disabled_by_default(self):
+        with override_settings(WIDGET_TWEAKS_OPTIONS_CACHE=False):
+            self.assertIsNone(cache.get_options_cache())
+
+    def test_same_output_as_rendering(self):
+        forms = [ChoicesForm(initial={"grouped": 4}), ChoicesForm({"plain": "3"})]
+        for form in forms:
+            for name in ("plain", "grouped", "multiple", "radio"):
+                field = widget_tweaks.add_class(form[name], "a")
+                expected = field.as_widget()
+                self.assertEqual(str(field), expected)
+                self.assertEqual(str(field), expected)
+
+    def test_options_are_reused(self):
+        first = str(widget_tweaks.add_class(ChoicesForm()["plain"], "a"))
+        form = ChoicesForm()
+        form.fields["plain"].widget.optgroups = None  # options are not built
+        second = render_form('{% render_field form.plain class="b" %}', form=form)
+        assertIn('<select name="plain" class="a"', first)
+        assertIn('<select name="plain" class="b"', second)
+        self.assertEqual(first.split(">", 1)[1], second.split(">", 1)[1])
+
+    def test_choices_changed_in_place(self):
+        form = ChoicesForm()
+        str(widget_tweaks.add_class(form["plain"], "a"))
+        form.fields["plain"].widget.choices[0] = (0, "changed")
+        res = str(widget_tweaks.add_class(form["plain"], "a"))
+        assertIn(">changed</option>", res)
+
+    def test_selected_value_and_choices(self):
+        form = ChoicesForm(initial={"plain": 2})
+        res = str(widget_tweaks.add_class(form["plain"], "a"))
+        assertIn('<option value="2" selected>', res)
+        form.fields["plain"].choices = [(1, "new")]
+        res = str(widget_tweaks.add_class(form["plain"], "a"))
+        assertIn(">new</option>", res)
+        assertNotIn("Option 2", res)
+
+    def test_selects_with_different_choices(self):
+        class TwoSelectsForm(forms.Form):
+            first = forms.ChoiceField(choices=[(1, "a"), (2, "b")])
+            second = forms.ChoiceField(choices=[(1, "c"), (2, "d")])
+
+        for _ in range(3):
+            form = TwoSelectsForm()
+            first = str(widget_tweaks.add_class(form["first"], "x"))
+            second = str(widget_tweaks.add_class(form["second"], "x"))
+            assertIn(">a</option>", first)
+            assertIn(">c</option>", second)
+        info = cache.get_options_cache().info()
+        self.assertEqual((info.hits, info.misses, info.currsize), (4, 2, 2))
+
+    def test_choices_mismatch_is_a_miss(self):
+        form = ChoicesForm()
+        str(widget_tweaks.add_class(form["plain"], "a"))
+        # an entry with the same key for other choices, e.g. a hash collision
+        options_cache = cache.get_options_cache()
+        key = next(iter(options_cache._entries))
+        options_cache._entries[key] = ([], "stale")
+        res = str(widget_tweaks.add_class(form["plain"], "a"))
+        assertNotIn("stale", res)
+        info = options_cache.info()
+        self.assertEqual((info.hits, info.misses), (0, 2))
+
+    def test_radio_is_not_cached(self):
+        str(widget_tweaks.add_class(ChoicesForm()["radio"], "a"))
+        info = cache.get_options_cache().info()
+        self.assertEqual((info.hits, info.misses, info.currsize), (0, 0, 0))
+
+
+class RenderFieldsTagTest(TestCase):
+    def test_render_all_fields(self):
+        res = render_form(
+            '{% render_fields form class+="form-control" %}{% endrender_fields %}'
+        )
+        self.assertEqual(res.count("<input"), 5)
+        self.assertEqual(res.count("<select"), 4)
+        assertIn('class="form-control"', res)
+        assertIn('class="class0 form-control"', res)
+
+    def test_render_content_per_field(self):
+        res = render_form(
+            '{% render_fields fields foo="bar" %}'
+            "<p>{{ field.name }}:{{ field }}</p>"
+            "{% endrender_fields %}",
+            fields=[MyForm()["simple"], MyForm()["with_cls"]],
+        )
+        self.assertEqual(res.count("<p>"), 2)
+        self.assertEqual(res.count('foo="bar"'), 2)
+        assertIn("<p>simple:<input", res)
+        assertIn("<p>with_cls:<input", res)
+
+    def test_field_override(self):
+        res = render_form(
+            '{% render_fields fields foo="bar" class+="a" %}'
+            '{% field_override "simple" foo="baz" type="email" %}'
+            '{% field_override name class+="b" %}'
+            "{{ field }}|"
+            "{% endrender_fields %}",
+            fields=[MyForm()["simple"], MyForm()["with_cls"]],
+            name="with_cls",
+        )
+        simple, with_cls, _ = res.split("|")
+        assertIn('foo="baz"', simple)
+        assertIn('type="email"', simple)
+        assertIn('class="a"', simple)
+        assertIn('foo="bar"', with_cls)
+        assertIn('class="class0 a b"', with_cls)
+
+    def test_widget_classes(self):
+        res = render_form(
+            "{% render_fields fields %}{% endrender_fields %}",
+            form=MyForm({}),
+            fields=[MyForm({})["simple"]],
+            WIDGET_ERROR_CLASS="error_class",
+            WIDGET_REQUIRED_CLASS="required_class",
+        )
+        assertIn('class="required_class error_class"', res)
+
+    def test_silence_without_fields(self):
+        res = render_form('{% render_fields nothing class="a" %}{% endrender_fields %}')
+        self.assertEqual(res, "")
+
+
+class InstrumentationTest(TestCase):
+    def setUp(self):
+        self.events = []
+        signals.filter_applied.connect(self._filter_applied)
+        signals.field_rendered.connect(self._field_rendered)
+
+    def tearDown(self):
+        signals.filter_applied.disconnect(self._filter_applied)
+        signals.field_rendered.disconnect(self._field_rendered)
+
+    def _filter_applied(self, **kwargs):
+        self.events.append(("filter_applied", kwargs))
+
+    def _field_rendered(self, **kwargs):
+        self.events.append(("field_rendered", kwargs))
+
+    def test_disabled_by_default(self):
+        render_field("simple", "attr", "foo:bar")
+        self.assertEqual(self.events, [])
+
+    def test_filters(self):
+        with override_settings(WIDGET_TWEAKS_INSTRUMENTATION=True):
+            render_field("with_cls", "add_class", "a", "attr", "foo:bar")
+        self.assertEqual(
+            [(name, kwargs.get("filter_name")) for name, kwargs in self.events],
+            [
+                ("filter_applied", "add_class"),
+                ("filter_applied", "attr"),
+                ("field_rendered", None),
+            ],
+        )
+        self.assertIs(self.events[0][1]["sender"], widget_tweaks.add_class)
+        self.assertIs(self.events[1][1]["sender"], widget_tweaks.set_attr)
+        rendered = self.events[-1][1]
+        self.assertEqual(rendered["source"], "filter")
+        self.assertEqual(rendered["field_name"], "with_cls")
+        self.assertEqual(rendered["widget_type"], "textinput")
+        self.assertEqual(rendered["attrs_count"], 2)
+        self.assertEqual(rendered["chain_depth"], 2)
+        self.assertGreaterEqual(rendered["duration"], 0)
+
+    def test_render_field(self):
+        with override_settings(WIDGET_TWEAKS_INSTRUMENTATION=True):
+            render_form(
+                '{% render_field form.choice foo="bar" egg="spam" class+="a" %}'
+            )
+        ((name, rendered),) = self.events
+        self.assertEqual(name, "field_rendered")
+        self.assertEqual(rendered["source"], "render_field")
+        self.assertEqual(rendered["field_name"], "choice")
+        self.assertEqual(rendered["widget_type"], "select")
+        self.assertEqual(rendered["attrs_count"], 3)
+        self.assertEqual(rendered["chain_depth"], 2)
+
+    def test_subwidget(self):
+        with override_settings(WIDGET_TWEAKS_INSTRUMENTATION=True):
+            render_choice_field("radio", 0, "attr", "foo:bar")
+        self.assertEqual(self.events[0][1]["field_name"], "radio")
+        self.assertEqual(self.events[1][1]["widget_type"], "radioselect")
+
+
+class FieldInfoTest(TestCase):
+    def test_field_info(self):
+        info = widget_tweaks.field_info(MyForm()["simple"])
+        self.assertEqual(
+            info,
+            ("charfield", "textinput", True, False, "text", False),
+        )
+        info = widget_tweaks.field_info(MyForm()["date"])
+        self.assertEqual(info.field_type, "datefield")
+        self.assertEqual(info.widget_type, "selectdatewidget")
+        self.assertEqual(info.input_type, "select")
+
+    def test_field_info_template(self):
+        res = render_form(
+            "{% with info=form.choice|field_info %}"
+            '{% if info.widget_type == "select" %}select {{ info.required }}{% endif %}'
+            "{% endwith %}"
+        )
+        self.assertEqual(res, "select True")
+
+    def test_field_info_tweaked_field(self):
+        res = render_form(
+            '{% with info=form.simple|attr:"foo:bar"|field_info %}'
+            "{{ info.widget_type }}{% endwith %}"
+        )
+        self.assertEqual(res, "textinput")
+
+    def test_field_info_without_field(self):
+        self.assertEqual(render_form("{{ form.nothing|field_info }}"), "")
+
+    def test_class_names_are_cached(self):
+        widget_tweaks._class_name.cache_clear()
+        render_form("{{ form.simple|widget_type }}{{ form.with_cls|widget_type }}")
+        info = widget_tweaks._class_name.cache_info()
+        self.assertEqual((info.hits, info.misses), (1, 1))
+
+
+class RenderFormsetTagTest(TestCase):
+    def _formset(self, data=None, extra=3):
+        return formset_factory(MyForm, extra=extra)(data)
+
+    def test_render_field_of_each_form(self):
+        res = render_form(
+            '{% render_formset formset "simple" class="a" %}{% endrender_formset %}',
+            formset=self._formset(),
+        )
+        self.assertEqual(res.count("<input"), 3)
+        self.assertEqual(res.count('class="a"'), 3)
+        for i in range(3):
+            assertIn(f'name="form-{i}-simple"', res)
+
+    def test_render_content(self):
+        res = render_form(
+            "{% render_formset formset name foo=bar %}"
+            "<tr>{{ form.prefix }} {{ field }}</tr>"
+            "{% endrender_formset %}",
+            formset=self._formset(extra=2),
+            name="with_cls",
+            bar="baz",
+        )
+        self.assertEqual(res.count("<tr>"), 2)
+        assertIn("<tr>form-0 <input", res)
+        assertIn("<tr>form-1 <input", res)
+        self.assertEqual(res.count('foo="baz"'), 2)
+
+    def test_missing_field(self):
+        res = render_form(
+            '{% render_formset formset "nope" class="a" %}{% endrender_formset %}|'
+            '{% render_formset formset "nope" %}<tr>{{ field }}</tr>{% endrender_formset %}',
+            formset=self._formset(),
+        )
+        self.assertEqual(res, "|")
+
+    def test_iter_render(self):
+        tpl = Template(
+            "{% load widget_tweaks %}"
+            '{% render_formset formset "simple" %}{% endrender_formset %}'
+        )
+        (node,) = tpl.nodelist.get_nodes_by_type(
+            widget_tweaks.FormsetFieldAttributeNode
+        )
+        rows = list(node.iter_render(Context({"formset": self._formset()})))
+        self.assertEqual(len(rows), 3)
+        assertIn('name="form-2-simple"', rows[2])
+
+    def test_error_class(self):
+        data = {
+            "form-TOTAL_FORMS": "1",
+            "form-INITIAL_FORMS": "0",
+            "form-0-simple": "",
+            "form-0-with_attrs": "changed",
+        }
+        res = render_form(
+            '{% render_formset formset "simple" %}{% endrender_formset %}',
+            formset=self._formset(data),
+            WIDGET_ERROR_CLASS="error",
+        )
+        assertIn('class="error"', res)
+
+
+class StreamingTest(TestCase):
+    def test_select_chunks(self):
+        field = widget_tweaks.add_class(ChoicesForm()["plain"], "form-select")
+        chunks = list(widget_tweaks.iter_field_html(field, chunk_size=3))
+        self.assertEqual("".join(chunks), str(field))
+        self.assertEqual(
+            chunks[0],
+            '<select name="plain" class="form-select" id="id_plain">',
+        )
+        self.assertEqual(len(chunks), 5)
+
+    def test_same_output_as_rendering(self):
+        form = ChoicesForm(initial={"grouped": 4})
+        for name in ("plain", "grouped", "multiple", "radio"):
+            field = widget_tweaks.set_attr(form[name], "foo:bar")
+            for chunk_size in (1, 2, 100):
+                self.assertEqual(
+                    "".join(widget_tweaks.iter_field_html(field, chunk_size)),
+                    str(field),
+                )
+
+    def test_plain_bound_field(self):
+        field = ChoicesForm()["multiple"]
+        html = "".join(widget_tweaks.iter_field_html(field, chunk_size=2))
+        self.assertEqual(html, str(field))
+        assertIn('<option value="1" selected>Option 1</option>', html)
+
+    def test_subwidget(self):
+        field = widget_tweaks.set_attr(ChoicesForm()["radio"][0], "foo:bar")
+        self.assertEqual(list(widget_tweaks.iter_field_html(field)), [str(field)])
+
+    def test_overridden_render_methods(self):
+        class WrappedSelect(forms.Select):
+            def render(self, name, value, attrs=None, renderer=None):
+                html = super().render(name, value, attrs, renderer)
+                return mark_safe(f"<span>{html}</span>")
+
+        class WrappedBoundField(forms.BoundField):
+            def as_widget(self, widget=None, attrs=None, only_initial=False):
+                html = super().as_widget(widget, attrs, only_initial)
+                return mark_safe(f"<div>{html}</div>")
+
+        class WrappedField(forms.ChoiceField):
+            def get_bound_field(self, form, field_name):
+                return WrappedBoundField(form, self, field_name)
+
+        class WrappedForm(forms.Form):
+            select = forms.ChoiceField(choices=[(1, "a")], widget=WrappedSelect)
+            wrapped = WrappedField(choices=[(1, "a")])
+
+        form = WrappedForm()
+        for name, start in (("select", "<span><select"), ("wrapped", "<div><select")):
+            field = widget_tweaks.add_class(form[name], "x")
+            html = "".join(widget_tweaks.iter_field_html(field, chunk_size=1))
+            self.assertEqual(html, str(field))
+            self.assertTrue(html.startswith(start))
+
+
+class ConcurrentRenderingTest(TestCase):
+    """
+    Render the same form instance concurrently and check that attributes
+    of one rendering never leak into another one.
+    """
+
+    workers = 16
+    renders = 200
+
+    def setUp(self):
+        self.form = MyForm()
+        self.template = Template(
+            "{% load widget_tweaks %}"
+            "{% render_field form.simple data-n=n class+=cls type=type %}|"
+            '{{ form.with_attrs|attr:attr|add_class:cls|remove_attr:"foo" }}|'
+            "{{ form.radio.0|append_attr:attr }}"
+        )
+        self.barrier = threading.Barrier(self.workers)
+
+    def render(self, n):
+        context = Context(
+            {
+                "form": self.form,
+                "n": n,
+                "cls": f"c{n}",
+                "type": f"t{n}",
+                "attr": f"data-n:{n}",
+            }
+        )
+        return n, self.template.render(context)
+
+    def check(self, results):
+        self.assertEqual(len(results), self.renders)
+        for n, res in results:
+            tag_field, filtered_field, subwidget = res.split("|")
+            assertIn(f'data-n="{n}"', tag_field)
+            assertIn(f'type="t{n}"', tag_field)
+            assertIn(f'class="c{n}"', filtered_field)
+            assertNotIn("foo=", filtered_field)
+            assertIn(f'data-n="{n}"', subwidget)
+            self.assertEqual(res.count("data-n="), 3, res)
+            self.assertEqual(res.count("class="), 2, res)
+        self.assertEqual(
+            self.form.fields["with_attrs"].widget.attrs, {"foo": "baz", "egg": "spam"}
+        )
+        self.assertEqual(self.form.fields["simple"].widget.input_type, "text")
+        self.assertEqual(self.form.fields["simple"].widget.attrs, {})
+
+    def test_threads(self):
+        def render(n):
+            if n < self.workers:
+                self.barrier.wait()
+            return self.render(n)
+
+        with ThreadPoolExecutor(self.workers) as executor:
+            results = list(executor.map(render, range(self.renders)))
+        self.check(results)
+
+    def test_asyncio_tasks(self):
+        async def render(n):
+            await asyncio.sleep(0)
+            return await asyncio.to_thread(self.render, n)
+
+        async def main():
+            return await asyncio.gather(*(render(n) for n in range(self.renders)))
+
+        self.check(asyncio.run(main()))
+
+
+class WidgetAttrsTagTest(TestCase):
+    def classes(self, res):
+        return [part.split('class="')[1].split('"')[0] for part in res.split("|")]
+
+    def test_attributes_and_widget_types(self):
+        res = render_form(
+            '{% widget_attrs class+="form-control" data-x="1" %}'
+            '{% widget_attrs for "select" class+="form-select" data-x="2" %}'
+            "{% render_field form.simple %}|{% render_field form.choice %}|"
+            '{% render_field form.with_cls class+="a" data-x="3" %}'
+            "{% endwidget_attrs %}{% endwidget_attrs %}|{% render_field form.simple %}"
+        )
+        simple, choice, with_cls, outside = res.split("|")
+        assertIn('class="form-control" data-x="1"', simple)
+        assertIn('class="form-control form-select" data-x="2"', choice)
+        assertIn('class="class0 form-control a" data-x="3"', with_cls)
+        assertNotIn("class=", outside)
+
+    def test_variable_widget_types(self):
+        res = render_form(
+            '{% widget_attrs for types class="a" %}{% render_field form.simple %}|'
+            "{% render_field form.choice %}{% endwidget_attrs %}",
+            types="TextInput",
+        )
+        simple, choice = res.split("|")
+        assertIn('class="a"', simple)
+        assertNotIn("class=", choice)
+
+    def test_widget_classes(self):
+        res = render_form(
+            '{% widget_attrs required_class="req" error_class="err" %}'
+            "{% render_field form.simple %}|"
+            '{% with WIDGET_REQUIRED_CLASS="inner" %}'
+            "{% render_field form.simple %}{% endwith %}|"
+            "{{ WIDGET_REQUIRED_CLASS }}{% endwidget_attrs %}",
+            form=MyForm({}),
+        )
+        simple, inner, variable = res.split("|")
+        self.assertEqual(self.classes(simple), ["req err"])
+        self.assertEqual(self.classes(inner), ["inner err"])
+        self.assertEqual(variable, "req")
+
+    def test_render_fields(self):
+        res = render_form(
+            '{% widget_attrs for "textinput" class+="form-control" %}'
+            '{% render_fields fields data-x="1" %}{% endrender_fields %}'
+            "{% endwidget_attrs %}",
+            fields=[MyForm()["simple"], MyForm()["choice"]],
+        )
+        assertIn('name="simple" class="form-control" data-x="1"', res)
+        assertIn('<select name="choice" data-x="1"', res)
+
+    def test_include(self):
+        res = render_form(
+            '{% widget_attrs class="a" %}{% include tmpl %}{% endwidget_attrs %}',
+            tmpl=Template("{% load widget_tweaks %}{% render_field form.simple %}"),
+        )
+        assertIn('class="a"', res)
+
+    def test_loop(self):
+        res = render_form(
+            "{% widget_attrs class=cls %}{% for field in fields %}"
+            "{% render_field field %}{% endfor %}{% endwidget_attrs %}",
+            fields=[MyForm()["simple"], MyForm()["with_attrs"]],
+            cls="a",
+        )
+        self.assertEqual(res.count('class="a"'), 2)
+
+    def test_syntax_errors(self):
+        for text in (
+            '{% widget_attrs for class="a" %}{% endwidget_attrs %}',
+            "{% widget_attrs a %}{% endwidget_attrs %}",
+            '{% widget_attrs class="a" %}',
+        ):
+            with self.subTest(text=text):
+                self.assertRaises(TemplateSyntaxError, render_form, text)
+
+
+class LazyWidgetClassesTest(TestCase):
+    def test_no_errors_lookup_without_error_class(self):
+        class Field:
+            @property
+            def errors(self):
+                raise AssertionError("errors should not be looked up")
+
+            def __str__(self):
+                return "field"
+
+        res = render_form("{% render_field field %}", field=Field())
+        self.assertEqual(res, "field")
+
+    def test_validation_with_error_class(self):
+        form = MyForm({})
+        res = render_form(
+            "{% render_field form.simple %}", form=form, WIDGET_ERROR_CLASS="err"
+        )
+        self.assertIsNotNone(form._errors)
+        assertIn('class="err"', res)
+
+    def test_scoped_classes(self):
+        res = render_form(
+            "{% render_field form.simple %}|"
+            '{% with WIDGET_REQUIRED_CLASS="inner" %}'
+            "{% render_field form.simple %}|"
+            '{% with WIDGET_ERROR_CLASS="err" %}{% render_field form.simple %}{% endwith %}|'
+            "{% render_field form.simple %}"
+            "{% endwith %}|"
+            "{% render_field form.simple %}",
+            form=MyForm({}),
+            WIDGET_REQUIRED_CLASS="outer",
+        )
+        self.assertEqual(
+            [part.split('class="')[1].split('"')[0] for part in res.split("|")],
+            ["outer", "inner", "inner err", "inner", "outer"],
+        )
+
+    def test_classes_in_loop(self):
+        res = render_form(
+            "{% for field in fields %}{% render_field field %}{% endfor %}",
+            fields=[MyForm()["simple"], MyForm()["with_cls"]],
+            WIDGET_REQUIRED_CLASS="req",
+        )
+        assertIn('class="req"', res)
+        assertIn('class="class0 req"', res)
+
+    def test_classes_rebound_in_loop(self):
+        res = render_form(
+            "{% for c in classes %}{% firstof c as WIDGET_REQUIRED_CLASS %}"
+            "{% render_field form.simple %}{% endfor %}",
+            classes=["one", "two", "three"],
+        )
+        self.assertEqual(
+            [part.split('"')[0] for part in res.split('class="')[1:]],
+            ["one", "two", "three"],
+        )
+
+
+class TemplateLoaderTest(TestCase):
+    def get_template(self, text):
+        engine = Engine(
+            loaders=[
+                (
+                    "widget_tweaks.loaders.Loader",
+                    [("django.template.loaders.locmem.Loader", {"t.html": text})],
+                )
+            ],
+            libraries={"widget_tweaks": "widget_tweaks.templatetags.widget_tweaks"},
+        )
+        return engine.get_template("t.html")
+
+    def test_literal_arguments_are_parsed(self):
+        template = self.get_template(
+            '{% load widget_tweaks %}{{ form.simple|attr:"foo:bar"|set_data:"x:1" }}'
+            '{% if form.simple|attr:"a:b" %}{{ form.with_cls|append_attr:"class:c" }}'
+            "{% endif %}"
+        )
+        filter_expressions = [
+            node.filter_expression
+            for node in template.nodelist.get_nodes_by_type(VariableNode)
+        ]
+        for filter_expression in filter_expressions:
+            for _, args in filter_expression.filters:
+                self.assertIsInstance(args[0][1], widget_tweaks.AttrSpec)
+        res = template.render(Context({"form": MyForm()}))
+        assertIn('foo="bar"', res)
+        assertIn('data-x="1"', res)
+        assertIn('class="class0 c"', res)
+
+    def test_literal_arguments_are_not_parsed_on_render(self):
+        template = self.get_template(
+            '{% load widget_tweaks %}{{ form.simple|attr:"foo:b&r"|set_data:"x:1" }}'
+        )
+        widget_tweaks.parse_attr_spec.cache_clear()
+        res = template.render(Context({"form": MyForm()}))
+        info = widget_tweaks.parse_attr_spec.cache_info()
+        self.assertEqual(info.hits + info.misses, 0)
+        assertIn('foo="b&amp;r"', res)
+        assertIn('data-x="1"', res)
+
+    def test_variable_arguments(self):
+        template = self.get_template(
+            "{% load widget_tweaks %}{{ form.simple|attr:spec }}"
+        )
+        res = template.render(Context({"form": MyForm(), "spec": "foo:bar"}))
+        assertIn('foo="bar"', res)
+
+    def test_invalid_arguments(self):
+        for text in (
+            '{{ form.simple|attr:"::" }}',
+            '{{ form.simple|attr:":foo" }}',
+            '{{ form.simple|append_attr:"a b:c" }}',
+            '{% if x %}{{ form.simple|set_data:"x=1" }}{% endif %}',
+            '{% with f=form.simple|attr:"<:x" %}{{ f }}{% endwith %}',
+            '{{ form.simple|remove_attr:"" }}',
+        ):
+            with self.subTest(text=text):
+                with self.assertRaisesRegex(TemplateSyntaxError, "t.html"):
+                    self.get_template("{% load widget_tweaks %}" + text)
+
+    def test_optimize_template(self):
+        template = Template('{% load widget_tweaks %}{{ form.simple|attr:"foo" }}')
+        self.assertIs(loaders.optimize_template(template), template)
+        self.assertTrue(template.widget_tweaks_optimized)
+        res = template.render(Context({"form": MyForm()}))
+        assertIn(" foo ", res)
+
+
+@skipIf(jinja2 is None, "Jinja2 is not installed")
+class Jinja2ExtensionTest(TestCase):
+    def render(self, text, **context):
+        env = jinja2.Environment(
+            extensions=["widget_tweaks.jinja2ext.WidgetTweaksExtension"],
+            autoescape=True,
+        )
+        return env.from_string(text).render(form=MyForm(), **context)
+
+    def test_filters(self):
+        res = self.render(
+            '{{ form.with_cls|add_class("a")|attr("foo:bar")|set_data("x:1") }}'
+        )
+        assertIn('class="class0 a"', res)
+        assertIn('foo="bar"', res)
+        assertIn('data-x="1"', res)
+        self.assertEqual(self.render("{{ form.simple|field_type }}"), "charfield")
+        self.assertEqual(self.render("{{ form.simple|widget_type }}"), "textinput")
+
+    def test_remove_attr(self):
+        res = self.render('{{ form.with_attrs|remove_attr("foo") }}')
+        assertNotIn("foo=", res)
+        assertIn('egg="spam"', res)
+
+    def test_render_field(self):
+        res = self.render(
+            '{% render_field form.with_cls class+="a" data-foo="bar" '
+            'v-bind:x=1 placeholder=form.simple.label foo="x" foo="y" %}'
+        )
+        assertIn('class="class0 a"', res)
+        assertIn('data-foo="bar"', res)
+        assertIn('v-bind:x="1"', res)
+        assertIn('placeholder="Simple"', res)
+        assertIn('foo="x"', res)
+        assertNotIn('foo="y"', res)
+
+    def test_render_field_widget_classes(self):
+        res = self.render(
+            "{% render_field form.simple %}", WIDGET_REQUIRED_CLASS="required"
+        )
+        assertIn('class="required"', res)
+
+    def test_render_field_is_not_escaped(self):
+        res = self.render("{% render_field form.simple %}")
+        self.assertTrue(res.startswith("<input"))
+
+    def test_render_field_syntax_error(self):
+        with self.assertRaises(jinja2.TemplateSyntaxError):
+            self.render("{% render_field form.simple foo %}")
+
+
+WARMUP_TEMPLATES = {
+    "form.html": '{% load widget_tweaks %}{{ form.simple|attr:"warm:up" }}',
+    "tag.html": '{% load i18n widget_tweaks %}{% render_field form.simple a="b" %}',
+    "plain.html": "{{ form.simple }}",
+}
+
+
+class WarmupTest(TestCase):
+    def get_engine(self, templates, loader="django.template.loaders.cached.Loader"):
+        return Engine(
+            loaders=[
+                (
+                    loader,
+                    [("django.template.loaders.locmem.Loader", templates)],
+                )
+            ],
+            libraries={
+                "i18n": "django.templatetags.i18n",
+                "widget_tweaks": "widget_tweaks.templatetags.widget_tweaks",
+            },
+        )
+
+    def test_find_templates(self):
+        engine = self.get_engine(WARMUP_TEMPLATES)
+        self.assertEqual(warmup.find_templates(engine), ["form.html", "tag.html"])
+
+    def test_warm_up(self):
+        engine = self.get_engine(WARMUP_TEMPLATES)
+        widget_tweaks.parse_attr_spec.cache_clear()
+        results = warmup.warm_up(engine=engine)
+        self.assertEqual([result.name for result in results], ["form.html", "tag.html"])
+        for result in results:
+            self.assertIsNone(result.error)
+            self.assertGreaterEqual(result.duration, 0)
+        self.assertEqual(widget_tweaks.parse_attr_spec.cache_info().currsize, 1)
+        # compiled templates are kept by the cached loader
+        loader = engine.template_loaders[0]
+        self.assertIn("form.html", [key for key in loader.get_template_cache])
+        engine.get_template("form.html").render(Context({"form": MyForm()}))
+        self.assertEqual(widget_tweaks.parse_attr_spec.cache_info().hits, 1)
+
+    def test_warm_up_with_widget_tweaks_loader(self):
+        engine = self.get_engine(WARMUP_TEMPLATES, "widget_tweaks.loaders.Loader")
+        results = warmup.warm_up(engine=engine)
+        self.assertEqual([result.error for result in results], [None, None])
+        # literal specs were parsed by the loader, rendering parses nothing
+        widget_tweaks.parse_attr_spec.cache_clear()
+        res = engine.get_template("form.html").render(Context({"form": MyForm()}))
+        assertIn('warm="up"', res)
+        info = widget_tweaks.parse_attr_spec.cache_info()
+        self.assertEqual(info.hits + info.misses, 0)
+
+    def test_errors(self):
+        engine = self.get_engine(
+            {"bad.html": "{% load widget_tweaks %}{% render_field %}"}
+        )
+        missing, bad = warmup.warm_up(["missing.html", "bad.html"], engine=engine)
+        self.assertEqual(missing.name, "missing.html")
+        self.assertEqual(type(missing.error).__name__, "TemplateDoesNotExist")
+        self.assertIsInstance(bad.error, TemplateSyntaxError)
+
+    def test_management_command(self):
+        templates = [
+            {
+                "BACKEND": "django.template.backends.django.DjangoTemplates",
+                "OPTIONS": {
+                    "loaders": [
+                        ("django.template.loaders.locmem.Loader", WARMUP_TEMPLATES)
+                    ]
+                },
+            }
+        ]
+        with override_settings(TEMPLATES=templates):
+            out = StringIO()
+            call_command("widget_tweaks_warmup", stdout=out)
+            assertIn("form.html: ", out.getvalue())
+            assertIn("Compiled 2 templates", out.getvalue())
+            assertNotIn("plain.html", out.getvalue())
+            with self.assertRaises(CommandError):
+                call_command("widget_tweaks_warmup", "missing.html", stderr=StringIO())
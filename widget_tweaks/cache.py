@@ -0,0 +1,219 @@
+"""
+Opt-in cache for the HTML of fields rendered with widget_tweaks filters and
+the ``render_field`` tag.
+
+Unbound forms render the same HTML for the same field and the same set of
+attribute operations, so the output can be reused across requests. The cache
+key is built from the form class, the field, its initial value and help
+text, the widget templates and attributes and the attribute operations. Bound forms, forms with errors and
+fields with lazily evaluated choices (e.g. ``ModelChoiceField``) are never
+cached.
+
+A second opt-in cache keeps the rendered options of ``Select`` and
+``SelectMultiple`` widgets, keyed by the choices and the selected values and
+checked against the widget's choices. Fields whose options are cached only
+render their outer ``<select>`` element, so large static choice lists are
+rendered once whatever the attributes of the select, for bound forms too.
+"""
+
+import hashlib
+from collections import OrderedDict, namedtuple
+from threading import Lock
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils import translation
+
+RENDER_CACHE_SIZE = 1024
+OPTIONS_CACHE_SIZE = 256
+KEY_PREFIX = "widget_tweaks:render:"
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+
+class RenderCache:
+    """
+    Thread-safe LRU cache of rendered field HTML. When ``backend`` (a Django
+    cache) is given, entries are stored there instead of in process memory.
+    """
+
+    def __init__(self, maxsize=RENDER_CACHE_SIZE, backend=None):
+        self.maxsize = maxsize
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key, valid=None):
+        """
+        Return the entry of ``key`` or None. Entries for which ``valid``
+        (if given) returns False are counted as misses and not returned.
+        """
+        if self.backend is not None:
+            html = self.backend.get(key)
+            if html is not None and valid is not None and not valid(html):
+                html = None
+            with self._lock:
+                self._count(html)
+            return html
+        with self._lock:
+            html = self._entries.get(key)
+            if html is not None:
+                if valid is None or valid(html):
+                    self._entries.move_to_end(key)
+                else:
+                    html = None
+            self._count(html)
+        return html
+
+    def _count(self, html):
+        if html is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+
+    def set(self, key, html):
+        if self.backend is not None:
+            self.backend.set(key, html)
+            return
+        with self._lock:
+            self._entries[key] = html
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def info(self):
+        with self._lock:
+            return CacheInfo(
+                self.hits,
+                self.misses,
+                None if self.backend is not None else self.maxsize,
+                None if self.backend is not None else len(self._entries),
+            )
+
+    def clear(self):
+        # entries stored in a cache backend are left to expire on their own
+        with self._lock:
+            self.hits = self.misses = 0
+            self._entries.clear()
+
+
+def _build_render_cache():
+    if not getattr(settings, "WIDGET_TWEAKS_RENDER_CACHE", False):
+        return None
+    alias = getattr(settings, "WIDGET_TWEAKS_RENDER_CACHE_BACKEND", None)
+    if alias:
+        return RenderCache(backend=caches[alias])
+    return RenderCache(
+        maxsize=getattr(settings, "WIDGET_TWEAKS_RENDER_CACHE_SIZE", RENDER_CACHE_SIZE)
+    )
+
+
+_render_cache = _build_render_cache()
+
+
+@receiver(setting_changed)
+def _reset_render_cache(setting, **kwargs):  # pylint: disable=unused-argument
+    global _render_cache  # pylint: disable=global-statement
+    if setting.startswith("WIDGET_TWEAKS_RENDER_CACHE"):
+        _render_cache = _build_render_cache()
+    elif setting == "WIDGET_TWEAKS_DEFAULT_ATTRS" and _render_cache is not None:
+        # cached fields were rendered with the previous default attributes
+        _render_cache.clear()
+
+
+def _build_options_cache():
+    if not getattr(settings, "WIDGET_TWEAKS_OPTIONS_CACHE", False):
+        return None
+    return RenderCache(
+        maxsize=getattr(
+            settings, "WIDGET_TWEAKS_OPTIONS_CACHE_SIZE", OPTIONS_CACHE_SIZE
+        )
+    )
+
+
+_options_cache = _build_options_cache()
+
+
+@receiver(setting_changed)
+def _reset_options_cache(setting, **kwargs):  # pylint: disable=unused-argument
+    global _options_cache  # pylint: disable=global-statement
+    if setting.startswith("WIDGET_TWEAKS_OPTIONS_CACHE"):
+        _options_cache = _build_options_cache()
+
+
+def get_options_cache():
+    """
+    Return the ``RenderCache`` of select options or None if it is disabled.
+    """
+    return _options_cache
+
+
+def get_render_cache():
+    """
+    Return the configured ``RenderCache`` or None if caching is disabled.
+    """
+    return _render_cache
+
+
+def render_cache_info():
+    """
+    Return hit/miss statistics of the render cache, or None if disabled.
+    """
+    if _render_cache is None:
+        return None
+    return _render_cache.info()
+
+
+def clear_render_cache():
+    if _render_cache is not None:
+        _render_cache.clear()
+
+
+def render_cache_key(bound_field, operations):
+    """
+    Return the cache key for rendering ``bound_field`` with ``operations``,
+    or None if the field must not be cached.
+    """
+    form = bound_field.form
+    if form.is_bound or bound_field.errors:
+        return None
+    field = bound_field.field
+    widget = field.widget
+    choices = getattr(widget, "choices", ())
+    if not isinstance(choices, (list, tuple)):
+        return None
+    parts = (
+        form.__class__.__module__,
+        form.__class__.__qualname__,
+        form.prefix,
+        form.auto_id,
+        form.use_required_attribute,
+        form.renderer.__class__.__qualname__,
+        bound_field.name,
+        bound_field.value(),
+        field.required,
+        field.disabled,
+        field.localize,
+        field.show_hidden_initial,
+        # e.g. aria-describedby is set for fields with a help text
+        field.help_text,
+        widget.__class__.__module__,
+        widget.__class__.__qualname__,
+        widget.template_name,
+        getattr(widget, "option_template_name", None),
+        getattr(widget, "input_type", None),
+        getattr(widget, "format", None),
+        sorted(widget.attrs.items(), key=lambda item: item[0]),
+        choices,
+        translation.get_language(),
+        [
+            (getattr(process, "__qualname__", process), attribute, value)
+            for process, attribute, value in operations
+        ],
+    )
+    digest = hashlib.md5(repr(parts).encode(), usedforsecurity=False).hexdigest()
+    return KEY_PREFIX + digest
@@ -0,0 +1,81 @@
+"""
+Default attributes of fields rendered with widget_tweaks filters and tags.
+
+The ``WIDGET_TWEAKS_DEFAULT_ATTRS`` setting maps widget or form field classes
+(or their dotted paths) to the attributes every such field gets, e.g.::
+
+    WIDGET_TWEAKS_DEFAULT_ATTRS = {
+        "django.forms.TextInput": {"class": "form-control"},
+        "django.forms.Select": {"class": "form-select"},
+        "django.forms.DateField": {"placeholder": "YYYY-MM-DD"},
+    }
+
+Entries apply to subclasses as well; entries of more specific classes win,
+and entries of field classes win over entries of widget classes. The
+attributes of each (field class, widget class) pair are resolved once and
+kept in a table.
+"""
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+
+class DefaultAttrs:
+    """
+    Table of the default attributes of each (field class, widget class).
+    """
+
+    def __init__(self, registry):
+        self.registry = {
+            import_string(cls) if isinstance(cls, str) else cls: dict(attrs)
+            for cls, attrs in registry.items()
+        }
+        self._table = {}
+
+    def _resolve(self, cls):
+        attrs = {}
+        # most specific classes are applied last
+        for base in reversed(cls.__mro__):
+            attrs.update(self.registry.get(base, ()))
+        return attrs
+
+    def get(self, field, widget):
+        """
+        Return the default attributes of ``field`` rendered with ``widget``
+        as a tuple of (attribute, value) pairs.
+        """
+        key = (field.__class__, widget.__class__)
+        try:
+            return self._table[key]
+        except KeyError:
+            attrs = self._resolve(widget.__class__)
+            attrs.update(self._resolve(field.__class__))
+            # concurrent misses compute the same value
+            attrs = self._table[key] = tuple(attrs.items())
+            return attrs
+
+
+def _build_default_attrs():
+    registry = getattr(settings, "WIDGET_TWEAKS_DEFAULT_ATTRS", None)
+    if not registry:
+        return None
+    return DefaultAttrs(registry)
+
+
+_default_attrs = _build_default_attrs()
+
+
+@receiver(setting_changed)
+def _reset_default_attrs(setting, **kwargs):  # pylint: disable=unused-argument
+    global _default_attrs  # pylint: disable=global-statement
+    if setting == "WIDGET_TWEAKS_DEFAULT_ATTRS":
+        _default_attrs = _build_default_attrs()
+
+
+def get_default_attrs():
+    """
+    Return the configured ``DefaultAttrs`` or None if there are no defaults.
+    """
+    return _default_attrs
@@ -0,0 +1,105 @@
+"""
+Jinja2 extension providing the widget_tweaks filters and ``render_field`` tag.
+
+Enable it in the ``Jinja2`` template backend::
+
+    TEMPLATES = [
+        {
+            "BACKEND": "django.template.backends.jinja2.Jinja2",
+            "OPTIONS": {
+                "extensions": ["widget_tweaks.jinja2ext.WidgetTweaksExtension"],
+            },
+        },
+    ]
+
+The filters are the ones of the Django template library, and
+``{% render_field form.title class+="css_class" placeholder=title %}`` takes
+attribute-value pairs like the Django tag, with any Jinja2 expression as
+value. ``WIDGET_ERROR_CLASS`` and ``WIDGET_REQUIRED_CLASS`` are looked up in
+the template context.
+"""
+
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+from widget_tweaks.templatetags import widget_tweaks
+
+FILTERS = {
+    "attr": widget_tweaks.set_attr,
+    "add_error_attr": widget_tweaks.add_error_attr,
+    "append_attr": widget_tweaks.append_attr,
+    "add_class": widget_tweaks.add_class,
+    "remove_class": widget_tweaks.remove_class,
+    "add_label_class": widget_tweaks.add_label_class,
+    "add_error_class": widget_tweaks.add_error_class,
+    "add_required_class": widget_tweaks.add_required_class,
+    "set_data": widget_tweaks.set_data,
+    "remove_attr": widget_tweaks.remove_attr,
+    "field_type": widget_tweaks.field_type,
+    "widget_type": widget_tweaks.widget_type,
+    "field_info": widget_tweaks.field_info,
+}
+
+# tokens that can be part of an attribute name, e.g. data-foo or v-bind:class
+ATTRIBUTE_NAME_TOKENS = {"sub": "-", "colon": ":", "dot": "."}
+
+
+class WidgetTweaksExtension(Extension):
+    tags = {"render_field"}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.filters.update(FILTERS)
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        field = parser.parse_expression()
+        set_attrs = []
+        append_attrs = []
+        while parser.stream.current.type != "block_end":
+            attr = self._parse_attribute_name(parser)
+            attrs = append_attrs if parser.stream.skip_if("add") else set_attrs
+            parser.stream.expect("assign")
+            value = parser.parse_expression(with_condexpr=False)
+            attrs.append(nodes.Tuple([nodes.Const(attr), value], "load"))
+        call = self.call_method(
+            "_render_field",
+            [
+                field,
+                nodes.List(set_attrs),
+                nodes.List(append_attrs),
+                nodes.ContextReference(),
+            ],
+        )
+        return nodes.Output([call], lineno=lineno)
+
+    @staticmethod
+    def _parse_attribute_name(parser):
+        stream = parser.stream
+        token = stream.expect("name")
+        name = token.value
+        while stream.current.type in ATTRIBUTE_NAME_TOKENS:
+            name += ATTRIBUTE_NAME_TOKENS[next(stream).type]
+            if stream.current.type in ("name", "integer"):
+                name += str(next(stream).value)
+        return name
+
+    @staticmethod
+    def _render_field(field, set_attrs, append_attrs, context):
+        values = {}
+        # with repeated attributes the first assignment wins,
+        # the same as for the Django tag
+        for attr, value in set_attrs:
+            values.setdefault(attr, str(value))
+        operations = widget_tweaks.attribute_operations(
+            values, [(attr, str(value)) for attr, value in append_attrs]
+        )
+        return Markup(
+            widget_tweaks.render_field_html(
+                field,
+                operations,
+                context.get("WIDGET_ERROR_CLASS"),
+                context.get("WIDGET_REQUIRED_CLASS"),
+            )
+        )
@@ -0,0 +1,102 @@
+"""
+Template loader checking widget_tweaks filter arguments when templates are
+loaded.
+
+Literal arguments of the ``attr``, ``append_attr``, ``add_error_attr`` and
+``set_data`` filters are parsed once, when the template is loaded, instead
+of on every render, and invalid attribute names (e.g. ``attr:"::"``) raise
+``TemplateSyntaxError`` right away. The loader caches templates like
+Django's cached loader and takes the loaders to wrap::
+
+    TEMPLATES = [
+        {
+            "BACKEND": "django.template.backends.django.DjangoTemplates",
+            "OPTIONS": {
+                "loaders": [
+                    (
+                        "widget_tweaks.loaders.Loader",
+                        [
+                            "django.template.loaders.filesystem.Loader",
+                            "django.template.loaders.app_directories.Loader",
+                        ],
+                    ),
+                ],
+            },
+        },
+    ]
+"""
+
+from django.template import Node, TemplateSyntaxError
+from django.template.base import FilterExpression
+from django.template.loaders import cached
+from django.template.smartif import TokenBase
+
+from widget_tweaks.templatetags import widget_tweaks
+
+SPEC_FILTERS = frozenset(
+    [
+        widget_tweaks.set_attr,
+        widget_tweaks.append_attr,
+        widget_tweaks.add_error_attr,
+        widget_tweaks.set_data,
+    ]
+)
+
+
+def _filter_expressions(value):
+    if isinstance(value, FilterExpression):
+        yield value
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _filter_expressions(item)
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _filter_expressions(item)
+    elif isinstance(value, TokenBase):  # {% if %} conditions
+        for attr in ("value", "first", "second"):
+            yield from _filter_expressions(getattr(value, attr, None))
+
+
+def iter_filter_expressions(template):
+    """
+    Yield the filter expressions used by the nodes of a compiled template.
+    """
+    for node in template.nodelist.get_nodes_by_type(Node):
+        yield from _filter_expressions(list(vars(node).values()))
+
+
+def _optimize_filters(filter_expression):
+    for i, (func, args) in enumerate(filter_expression.filters):
+        if len(args) != 1:
+            continue
+        lookup, arg = args[0]
+        if lookup or not isinstance(arg, str):
+            continue
+        if func in SPEC_FILTERS:
+            spec = widget_tweaks.AttrSpec(arg)
+            filter_expression.filters[i] = (func, [(False, spec)])
+        elif func is widget_tweaks.remove_attr:
+            widget_tweaks.validate_attribute_name(arg, arg)
+
+
+def optimize_template(template):
+    """
+    Validate and pre-parse the literal widget_tweaks filter arguments of a
+    compiled template. Templates are only processed once.
+    """
+    if getattr(template, "widget_tweaks_optimized", False):
+        return template
+    for filter_expression in iter_filter_expressions(template):
+        try:
+            _optimize_filters(filter_expression)
+        except TemplateSyntaxError as e:
+            raise TemplateSyntaxError(
+                f"{e} (in template {template.origin.name!r})"
+            ) from e
+    template.widget_tweaks_optimized = True
+    return template
+
+
+class Loader(cached.Loader):
+    def get_template(self, template_name, skip=None):
+        return optimize_template(super().get_template(template_name, skip))
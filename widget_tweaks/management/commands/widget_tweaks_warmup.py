@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from widget_tweaks.warmup import warm_up
+
+
+class Command(BaseCommand):
+    help = (
+        "Compile the templates using widget_tweaks (or the given templates) "
+        "and fill the widget_tweaks parse caches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "template_names",
+            nargs="*",
+            help="Templates to compile, by default the ones loading widget_tweaks.",
+        )
+
+    def handle(self, *args, **options):
+        results = warm_up(options["template_names"] or None)
+        failed = 0
+        for result in results:
+            if result.error is not None:
+                failed += 1
+                self.stderr.write(f"{result.name}: {result.error}")
+            elif options["verbosity"] >= 1:
+                self.stdout.write(f"{result.name}: {result.duration * 1000:.1f} ms")
+        if failed:
+            raise CommandError(
+                f"{failed} of {len(results)} templates failed to compile."
+            )
+        if options["verbosity"] >= 1:
+            total = sum(result.duration for result in results)
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Compiled {len(results)} templates in {total * 1000:.1f} ms."
+                )
+            )
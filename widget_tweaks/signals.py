@@ -0,0 +1,36 @@
+"""
+Opt-in instrumentation of widget_tweaks filters and tags.
+
+Signals are only sent when the ``WIDGET_TWEAKS_INSTRUMENTATION`` setting is
+``True``; otherwise the filters and tags only check a module-level flag.
+
+``filter_applied`` is sent by the filter function (e.g.
+``widget_tweaks.templatetags.widget_tweaks.set_attr``) after a widget_tweaks
+filter is applied to a field, with the arguments ``filter_name`` (the
+template filter name, e.g. ``"attr"``), ``field_name`` and ``duration`` (in
+seconds).
+
+``field_rendered`` is sent after a field tweaked by filters or by the
+``render_field``/``render_fields`` tags is rendered, with the arguments
+``source`` (``"render_field"``, ``"render_fields"`` or ``"render_formset"``
+for these tags without content, ``"filter"`` otherwise),
+``field_name``, ``widget_type``, ``attrs_count`` (the number of attribute
+operations applied), ``chain_depth`` (the number of operations on the field)
+and ``duration`` (in seconds).
+"""
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import Signal, receiver
+
+filter_applied = Signal()
+field_rendered = Signal()
+
+instrumentation_enabled = getattr(settings, "WIDGET_TWEAKS_INSTRUMENTATION", False)
+
+
+@receiver(setting_changed)
+def _reset_instrumentation(setting, value, **kwargs):  # pylint: disable=unused-argument
+    global instrumentation_enabled  # pylint: disable=global-statement
+    if setting == "WIDGET_TWEAKS_INSTRUMENTATION":
+        instrumentation_enabled = bool(value)
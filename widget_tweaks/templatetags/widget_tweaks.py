@@ -1,123 +1,842 @@
+import os
 import re
-import types
+from collections import namedtuple
 from copy import copy
-from django.template import Library, Node, TemplateSyntaxError
+from functools import lru_cache, wraps
+from time import perf_counter
+from types import MappingProxyType, MethodType
+from weakref import WeakKeyDictionary
+
+import django.forms
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.forms.boundfield import BoundField
+from django.forms.renderers import DjangoTemplates
+from django.forms.widgets import Input, Select, SelectMultiple, Widget
+from django.template import Library, Node, TemplateSyntaxError, Variable
+from django.template.base import FilterExpression, TextNode, Token, TokenType
+from django.utils.html import conditional_escape, escape
+from django.utils import translation
+from django.utils.safestring import SafeData, SafeString, mark_safe
+
+from widget_tweaks import signals
+from widget_tweaks.cache import get_options_cache, get_render_cache, render_cache_key
+from widget_tweaks.defaults import get_default_attrs
 
 register = Library()
 
+ATTR_SPEC_CACHE_SIZE = 512
+PARSE_CACHE_SIZE = 512
+ATTR_SPEC_SEPARATOR_RE = re.compile(r"(?<!:):(?!:)")
+STREAM_CHUNK_SIZE = 100
+SUBWIDGET_PREFIX = "subwidget."
+# base for subwidget attributes, which already include the widget attributes
+EMPTY_WIDGET = Widget()
+SELECT_END = "\n</select>"
+
+DJANGO_WIDGET_TEMPLATES_DIR = os.path.join(
+    os.path.dirname(django.forms.__file__), "templates", "django", "forms", "widgets"
+)
+INPUT_TEMPLATE = "django/forms/widgets/input.html"
+ATTRS_TEMPLATE = "django/forms/widgets/attrs.html"
+# templates of the Input widgets that only include input.html
+INPUT_TEMPLATE_NAMES = frozenset(
+    [INPUT_TEMPLATE]
+    + [
+        f"django/forms/widgets/{name}.html"
+        for name in (
+            "text",
+            "number",
+            "email",
+            "url",
+            "password",
+            "hidden",
+            "date",
+            "datetime",
+            "time",
+            "checkbox",
+            "search",
+            "tel",
+            "color",
+            "file",
+        )
+    ]
+)
+# renderer -> {template name: whether it is a builtin input template}
+_builtin_input_templates = WeakKeyDictionary()
+# BoundField methods rendering the field through ``self``, which are called
+# with the proxy as the field so that they render the tweaked widget
+RENDERING_METHODS = frozenset(
+    ["as_field_group", "render", "get_context", "as_hidden", "as_text", "as_textarea"]
+)
+
+
+def silence_without_field(fn=None, name=None):
+    """
+    Decorate a filter to return an empty string for missing fields and to
+    send ``filter_applied`` with the filter ``name`` (by default the name of
+    the function) when instrumentation is enabled. The decorated filter
+    function is the sender of the signal.
+    """
+    if fn is None:
+        return lambda fn: silence_without_field(fn, name)
+    filter_name = name or fn.__name__
 
-def silence_without_field(fn):
+    @wraps(fn)
     def wrapped(field, attr):
         if not field:
             return ""
-        return fn(field, attr)
+        if not signals.instrumentation_enabled:
+            return fn(field, attr)
+        start = perf_counter()
+        result = fn(field, attr)
+        signals.filter_applied.send(
+            sender=wrapped,
+            filter_name=filter_name,
+            field_name=_field_name(field),
+            duration=perf_counter() - start,
+        )
+        return result
 
     return wrapped
 
 
-def _process_field_attributes(field, attr, process):
-    # split attribute name and value from 'attr:value' string
-    # params = attr.split(':', 1)
-    # attribute = params[0]
-    params = re.split(r"(?<!:):(?!:)", attr, maxsplit=1)
-    # attribute = params[0]
+def _field_name(field):
+    if hasattr(field, "parent_widget"):  # BoundWidget
+        return field.data.get("name")
+    return getattr(field, "name", None)
+
+
+def _parse_attr_spec(attr):
+    """
+    Split 'attr:value' filter argument into (attribute, value) pair.
+    Single colons separate the name from the value, double colons are
+    unescaped to a literal colon in the attribute name. Attributes
+    without a value get ``True`` (e.g. 'autofocus').
+    """
+    params = ATTR_SPEC_SEPARATOR_RE.split(attr, maxsplit=1)
     attribute = params[0].replace("::", ":")
     value = params[1] if len(params) == 2 else True
-    field = copy(field)
+    return attribute, value
 
-    if not hasattr(field, "as_widget"):
-        old_tag = field.tag
 
-        def tag(self, wrap_label=False):  # pylint: disable=unused-argument
-            attrs = self.data["attrs"]
-            process(self.parent_widget, attrs, attribute, value)
-            html = old_tag(wrap_label=False)
-            self.tag = old_tag
-            return html
+INVALID_ATTRIBUTE_CHARS_RE = re.compile(r"[\s\"'<>/=]")
 
-        field.tag = types.MethodType(tag, field)
-        return field
 
-    # decorate field.as_widget method with updated attributes
-    old_as_widget = field.as_widget
+def validate_attribute_name(attribute, arg):
+    """
+    Raise ``TemplateSyntaxError`` if ``attribute`` (parsed from the filter
+    argument ``arg``) is not a valid HTML attribute name.
+    """
+    if not attribute.strip(":") or INVALID_ATTRIBUTE_CHARS_RE.search(attribute):
+        raise TemplateSyntaxError(
+            f"Invalid attribute name {attribute!r} in widget_tweaks filter "
+            f"argument {arg!r}"
+        )
 
-    def as_widget(self, widget=None, attrs=None, only_initial=False):
-        attrs = attrs or {}
-        process(widget or self.field.widget, attrs, attribute, value)
-        if attribute == "type":  # change the Input type
-            self.field.widget.input_type = value
-            del attrs["type"]
-        html = old_as_widget(widget, attrs, only_initial)
-        self.as_widget = old_as_widget
+
+class AttrSpec(SafeString):
+    """
+    Literal 'attr:value' filter argument parsed and validated when the
+    template is loaded (see ``widget_tweaks.loaders``).
+
+    Django marks literal filter arguments safe when passing them to the
+    filter; ``mark_safe()`` returns a ``SafeString`` such as this one
+    unchanged, so the filter gets the parsed spec.
+    """
+
+    def __new__(cls, arg):
+        spec = super().__new__(cls, arg)
+        attribute, value = _parse_attr_spec(arg)
+        validate_attribute_name(attribute, arg)
+        spec.parsed = (attribute, _pre_escaped(value))
+        return spec
+
+
+def _lru_cached(func, setting, default_size):
+    """
+    Return ``func`` wrapped in a LRU cache sized by ``setting``.
+    Setting the size to 0 (or None) disables the cache.
+    """
+    size = getattr(settings, setting, default_size)
+    if not size:
+        return func
+    return lru_cache(maxsize=size)(func)
+
+
+# filter arguments are almost always template literals,
+# so each distinct spec is parsed once
+parse_attr_spec = _lru_cached(
+    _parse_attr_spec, "WIDGET_TWEAKS_ATTR_SPEC_CACHE_SIZE", ATTR_SPEC_CACHE_SIZE
+)
+
+
+class TweakedField:
+    """
+    Stand-in for a BoundField (or a BoundWidget for fields with several
+    subwidgets) that carries the attribute operations requested by
+    widget_tweaks filters.
+
+    Chaining filters does not wrap the field once per filter: every filter
+    returns a new proxy around the original field with its operation
+    appended, and all operations are applied in a single pass when the
+    field is rendered. Everything else is delegated to the wrapped field.
+
+    Neither the proxy nor the wrapped field are modified when rendering, so
+    the same proxy or field can be rendered concurrently from several
+    threads or asyncio tasks.
+    """
+
+    # proxies are created for every filter application, so they only
+    # carry the wrapped field and the operations
+    __slots__ = ("_field", "_operations")
+
+    def __init__(self, field, operations):
+        self._field = field
+        self._operations = operations
+
+    def __getattr__(self, name):
+        if name in ("_field", "_operations"):
+            # not initialized yet, e.g. while being copied or unpickled
+            raise AttributeError(name)
+        if name in RENDERING_METHODS and hasattr(self._field, "as_widget"):
+            method = getattr(type(self._field), name, None)
+            if method is not None:
+                return MethodType(method, self)
+        return getattr(self._field, name)
+
+    def __bool__(self):
+        return bool(self._field)
+
+    def __len__(self):
+        return len(self._field)
+
+    def __iter__(self):
+        return iter(self._field)
+
+    def __getitem__(self, idx):
+        return self._field[idx]
+
+    def __str__(self):
+        return _render_tweaked_field(self, "filter")
+
+    __html__ = __str__
+
+    def _html(self):
+        if not hasattr(self._field, "as_widget"):
+            return self.tag()
+        render_cache = get_render_cache()
+        if render_cache is None:
+            return self._render()
+        key = render_cache_key(self._field, self._operations)
+        if key is None:
+            return self._render()
+        html = render_cache.get(key)
+        if html is None:
+            html = self._render()
+            render_cache.set(key, html)
         return html
 
-    field.as_widget = types.MethodType(as_widget, field)
-    return field
+    def _render(self):
+        widget, attrs = self._widget_attrs(None, None)
+        html = None
+        # fields overriding as_widget() are always rendered by it
+        if type(self._field).as_widget is BoundField.as_widget:
+            if isinstance(widget, Input):
+                html = self._render_input(widget, attrs)
+            else:
+                options_cache = get_options_cache()
+                if options_cache is not None:
+                    html = self._render_select(widget, attrs, options_cache)
+        if html is None:
+            html = self._field.as_widget(widget, attrs)
+        if self._field.field.show_hidden_initial:
+            html += self._field.as_hidden(only_initial=True)
+        return html
 
+    def _extend(self, operations):
+        return TweakedField(self._field, self._operations + tuple(operations))
 
-@register.filter("attr")
-@silence_without_field
-def set_attr(field, attr):
-    def process(widget, attrs, attribute, value):  # pylint: disable=unused-argument
+    def _apply_operations(self, widget, attrs, defaults=()):
+        for attribute, value in defaults:
+            _set_default(widget, attrs, attribute, value)
+        # filters are applied right to left, so that the leftmost
+        # filter of a chain wins
+        for process, attribute, value in reversed(self._operations):
+            process(widget, attrs, attribute, value)
+        # subwidget attributes are applied by _subwidget_operations()
+        for attribute in [a for a in attrs if a.startswith(SUBWIDGET_PREFIX)]:
+            del attrs[attribute]
+        return _serialize_class_lists(attrs)
+
+    def _removed_attributes(self):
+        return {
+            attribute
+            for process, attribute, _ in self._operations
+            if process is _remove_value and not attribute.startswith(SUBWIDGET_PREFIX)
+        }
+
+    def _subwidget_operations(self):
+        """
+        Return the operations targeting subwidgets
+        ('subwidget.<index or name>.<attribute>') as a list of
+        (target, process, attribute, value) tuples.
+        """
+        operations = []
+        for process, attribute, value in self._operations:
+            if process is _update_values:
+                targeted = [
+                    (_set_value, key, item)
+                    for key, item in value.items()
+                    if key.startswith(SUBWIDGET_PREFIX)
+                ]
+            elif attribute is not None and attribute.startswith(SUBWIDGET_PREFIX):
+                targeted = [(process, attribute, value)]
+            else:
+                continue
+            for process, attribute, value in targeted:
+                target, _, attribute = attribute[len(SUBWIDGET_PREFIX) :].partition(".")
+                if attribute:
+                    operations.append((target, process, attribute, value))
+        return operations
+
+    def _widget_attrs(self, widget, attrs):
+        # attribute removals and input type changes are applied to a copy
+        # of the widget, so the form's widget is never modified
+        widget = widget or self._field.field.widget
+        removed = self._removed_attributes()
+        copied = False
+        if removed:
+            widget, copied = copy(widget), True
+            widget.attrs = {k: v for k, v in widget.attrs.items() if k not in removed}
+        attrs = dict(attrs) if attrs else {}
+        default_attrs = get_default_attrs()
+        defaults = ()
+        if default_attrs is not None:
+            defaults = [
+                (attribute, value)
+                for attribute, value in default_attrs.get(self._field.field, widget)
+                if attribute not in removed
+            ]
+        emptied = self._apply_operations(widget, attrs, defaults)
+        emptied &= widget.attrs.keys()
+        subwidget_operations = self._subwidget_operations()
+        if emptied or "type" in attrs or subwidget_operations:
+            if not copied:
+                widget = copy(widget)
+                widget.attrs = widget.attrs.copy()
+            for attribute in emptied:  # all of its classes were removed
+                del widget.attrs[attribute]
+            if "type" in attrs:  # change the Input type
+                widget.input_type = attrs.pop("type")
+            if subwidget_operations:
+                widget.get_context = _tweak_subwidgets(
+                    widget.get_context, subwidget_operations
+                )
+        return widget, attrs
+
+    def _render_input(self, widget, attrs):
+        """
+        Render an ``Input`` widget using one of Django's input templates
+        without the template engine, or return None if it can't be.
+        """
+        bound = self._field
+        renderer = bound.form.renderer
+        if (
+            "get_context" in vars(widget)
+            or not _has_default_render(widget)
+            or not _has_builtin_input_template(widget, renderer)
+        ):
+            return None
+        # the same as BoundField.as_widget()
+        if bound.field.localize:
+            widget.is_localized = True
+        attrs = bound.build_widget_attrs(attrs, widget)
+        if bound.auto_id and "id" not in widget.attrs:
+            attrs.setdefault("id", bound.auto_id)
+        context = widget.get_context(bound.html_name, bound.value(), attrs)
+        return _serialize_input(context["widget"])
+
+    def _render_select(self, widget, attrs, options_cache):
+        """
+        Render a ``Select`` or ``SelectMultiple`` widget with its options
+        taken from ``options_cache``, or return None if the widget's
+        options can't be cached.
+        """
+        bound = self._field
+        renderer = bound.form.renderer
+        choices = widget.choices
+        if (
+            type(widget) not in (Select, SelectMultiple)
+            or "get_context" in vars(widget)  # targets options
+            or not _is_streamable(widget, renderer)
+            or not isinstance(choices, (list, tuple))
+        ):
+            return None
+        fingerprint = _choices_fingerprint(choices)
+        if fingerprint is None:
+            return None
+        # the same as BoundField.as_widget() and Select.get_context(),
+        # without building the options
+        if bound.field.localize:
+            widget.is_localized = True
+        attrs = bound.build_widget_attrs(attrs, widget)
+        if bound.auto_id and "id" not in widget.attrs:
+            attrs.setdefault("id", bound.auto_id)
+        context = Widget.get_context(widget, bound.html_name, bound.value(), attrs)
+        if widget.allow_multiple_selected:
+            context["widget"]["attrs"]["multiple"] = True
+        context["widget"]["optgroups"] = []
+        html = renderer.render(widget.template_name, context)
+        if not html.endswith(SELECT_END):
+            return None
+        # options don't inherit the attributes of a select, so they only
+        # depend on the choices and the selected values. Choices with the
+        # same hash are compared with the cached copy.
+        value = context["widget"]["value"]
+        key = (type(widget), fingerprint, tuple(value), translation.get_language())
+        cached = options_cache.get(key, lambda entry: entry[0] == choices)
+        if cached is not None:
+            options_html = cached[1]
+        else:
+            option_template = renderer.get_template(widget.option_template_name)
+            optgroups = widget.optgroups(bound.html_name, value, attrs)
+            options_html = "".join(_iter_options(option_template, optgroups))
+            options_cache.set(key, (list(choices), options_html))
+        return mark_safe(html[: -len(SELECT_END)] + options_html + SELECT_END)
+
+    def as_widget(self, widget=None, attrs=None, only_initial=False):
+        widget, attrs = self._widget_attrs(widget, attrs)
+        return self._field.as_widget(widget, attrs, only_initial)
+
+    def iter_html(self, chunk_size=STREAM_CHUNK_SIZE):
+        """
+        Yield the HTML of the field in chunks, e.g. to feed a
+        ``StreamingHttpResponse``. Options of ``Select`` and
+        ``SelectMultiple`` widgets rendered with the default templates are
+        yielded ``chunk_size`` at a time; other fields are yielded at once.
+        """
+        if not hasattr(self._field, "as_widget"):
+            yield self.tag()
+            return
+        bound = self._field
+        widget, attrs = self._widget_attrs(None, None)
+        renderer = bound.form.renderer
+        if (
+            type(bound).as_widget is not BoundField.as_widget
+            or not _has_default_render(widget)
+            or not _is_streamable(widget, renderer)
+        ):
+            yield str(self)
+            return
+        # the same as BoundField.as_widget() up to widget.render()
+        if bound.field.localize:
+            widget.is_localized = True
+        attrs = bound.build_widget_attrs(attrs, widget)
+        if bound.auto_id and "id" not in widget.attrs:
+            attrs.setdefault("id", bound.auto_id)
+        context = widget.get_context(bound.html_name, bound.value(), attrs)
+        optgroups = context["widget"]["optgroups"]
+        context["widget"]["optgroups"] = []
+        html = renderer.render(widget.template_name, context)
+        if not html.endswith(SELECT_END):
+            yield str(self)
+            return
+        yield mark_safe(html[: -len(SELECT_END)])
+        option_template = renderer.get_template(widget.option_template_name)
+        chunk = []
+        for fragment in _iter_options(option_template, optgroups):
+            chunk.append(fragment)
+            if len(chunk) >= chunk_size:
+                yield mark_safe("".join(chunk))
+                chunk = []
+        chunk.append(SELECT_END)
+        if bound.field.show_hidden_initial:
+            chunk.append(bound.as_hidden(only_initial=True))
+        yield mark_safe("".join(chunk))
+
+    def tag(self, wrap_label=False):  # pylint: disable=unused-argument
+        bound_widget = self._field
+        removed = self._removed_attributes()
+        attrs = {
+            k: v for k, v in bound_widget.data["attrs"].items() if k not in removed
+        }
+        self._apply_operations(bound_widget.parent_widget, attrs)
+        bound_widget = bound_widget.__class__(
+            bound_widget.parent_widget,
+            {**bound_widget.data, "attrs": attrs},
+            bound_widget.renderer,
+        )
+        return bound_widget.tag(wrap_label=False)
+
+
+def _tweak_subwidgets(get_context, operations):
+    """
+    Wrap the ``get_context`` method of a widget to apply ``operations``
+    (see ``TweakedField._subwidget_operations``) to the attributes of its
+    subwidgets: the widgets of a ``MultiWidget`` or ``SelectDateWidget``,
+    targeted by index or name (e.g. 'year'), or the options of a choice
+    widget, targeted by index ('1', or '0_1' for the second option of the
+    first group).
+    """
+
+    def wrapped(name, value, attrs):
+        context = get_context(name, value, attrs)
+        widget = context["widget"]
+        subwidgets = []
+        for i, subwidget in enumerate(widget.get("subwidgets", ())):
+            suffix = subwidget["name"][len(name) :].lstrip("_")
+            subwidgets.append(((str(i), suffix), subwidget))
+        for _, options, _ in widget.get("optgroups", ()):
+            for option in options:
+                subwidgets.append(((str(option["index"]),), option))
+        for targets, subwidget in subwidgets:
+            subwidget_operations = [
+                (process, attribute, value)
+                for target, process, attribute, value in operations
+                if target in targets
+            ]
+            if subwidget_operations:
+                subwidget["attrs"] = attrs = dict(subwidget["attrs"])
+                for process, attribute, value in subwidget_operations:
+                    if process is _remove_value:
+                        attrs.pop(attribute, None)
+                for process, attribute, value in reversed(subwidget_operations):
+                    process(EMPTY_WIDGET, attrs, attribute, value)
+                _serialize_class_lists(attrs)
+        return context
+
+    return wrapped
+
+
+def _choices_fingerprint(choices):
+    """
+    Return a hash of ``choices`` (including the options of groups) for the
+    key of the options cache, or None if they can't be hashed.
+    """
+    try:
+        return hash(
+            tuple(
+                (value, tuple(label) if isinstance(label, (list, tuple)) else label)
+                for value, label in choices
+            )
+        )
+    except (TypeError, ValueError):
+        return None
+
+
+def _has_default_render(widget):
+    """
+    Return True if ``widget`` is rendered by ``Widget.render()``, which
+    only renders its template with the context of ``get_context()``.
+    """
+    return (
+        type(widget).render is Widget.render and type(widget)._render is Widget._render
+    )
+
+
+def _has_builtin_input_template(widget, renderer):
+    """
+    Return True if ``widget`` is rendered with an unmodified Django input
+    template, which ``_serialize_input`` renders the same way.
+    """
+    if type(renderer) is not DjangoTemplates:  # pylint: disable=unidiomatic-typecheck
+        return False
+    templates = _builtin_input_templates.get(renderer)
+    if templates is None:
+        templates = _builtin_input_templates.setdefault(renderer, {})
+    try:
+        return templates[widget.template_name]
+    except KeyError:
+        pass
+    builtin = widget.template_name in INPUT_TEMPLATE_NAMES and all(
+        str(renderer.get_template(name).origin.name).startswith(
+            DJANGO_WIDGET_TEMPLATES_DIR
+        )
+        for name in (widget.template_name, INPUT_TEMPLATE, ATTRS_TEMPLATE)
+    )
+    # concurrent misses compute the same value
+    templates[widget.template_name] = builtin
+    return builtin
+
+
+def _attr_value(value):
+    # the same as {{ value|stringformat:'s' }}
+    if isinstance(value, tuple):
+        value = str(value)
+    try:
+        text = "%s" % value  # pylint: disable=consider-using-f-string
+    except (TypeError, ValueError):
+        return ""
+    if isinstance(value, SafeData):
+        return text
+    return escape(text)
+
+
+def _serialize_input(widget):
+    """
+    Return the HTML of an input widget from its template context, as
+    rendered by Django's input.html and attrs.html templates.
+    """
+    parts = [
+        f'<input type="{conditional_escape(widget["type"])}" '
+        f'name="{conditional_escape(widget["name"])}"'
+    ]
+    if widget["value"] is not None:
+        parts.append(f' value="{_attr_value(widget["value"])}"')
+    for name, value in widget["attrs"].items():
+        if value is True:
+            parts.append(f" {conditional_escape(name)}")
+        elif value is not False:
+            parts.append(f' {conditional_escape(name)}="{_attr_value(value)}"')
+    parts.append(">")
+    return mark_safe("".join(parts))
+
+
+def _iter_options(option_template, optgroups):
+    """
+    Yield the HTML of each option of a select, with the optgroup tags
+    around them, as the default select template renders it.
+    """
+    for group_name, options, _ in optgroups:
+        prefix = ""
+        if group_name:
+            prefix = f'\n  <optgroup label="{conditional_escape(group_name)}">'
+        for option in options:
+            yield prefix + "\n  " + option_template.render({"widget": option})
+            prefix = ""
+        if group_name:
+            yield prefix + "\n  </optgroup>"
+
+
+def _is_streamable(widget, renderer):
+    return (
+        isinstance(widget, Select)
+        and widget.template_name == "django/forms/widgets/select.html"
+        and widget.option_template_name == "django/forms/widgets/select_option.html"
+        and type(renderer) is DjangoTemplates  # pylint: disable=unidiomatic-typecheck
+    )
+
+
+def iter_field_html(field, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Yield the HTML of a bound field (tweaked by widget_tweaks filters or
+    not) in chunks. See ``TweakedField.iter_html``.
+    """
+    if not isinstance(field, TweakedField):
+        field = TweakedField(field, ())
+    return field.iter_html(chunk_size)
+
+
+def _add_operations(field, operations):
+    if isinstance(field, TweakedField):
+        return field._extend(operations)  # pylint: disable=protected-access
+    return TweakedField(field, tuple(operations))
+
+
+def _render_tweaked_field(field, source):
+    # pylint: disable=protected-access
+    if not signals.instrumentation_enabled:
+        return field._html()
+    start = perf_counter()
+    html = field._html()
+    duration = perf_counter() - start
+    bound = field._field
+    widget = getattr(bound, "parent_widget", None) or bound.field.widget
+    signals.field_rendered.send(
+        sender=TweakedField,
+        source=source,
+        field_name=_field_name(bound),
+        widget_type=widget.__class__.__name__.lower(),
+        attrs_count=sum(
+            len(value) if process is _update_values else 1
+            for process, _, value in field._operations
+        ),
+        chain_depth=len(field._operations),
+        duration=duration,
+    )
+    return html
+
+
+def _process_field_attributes(field, attr, process, prefix=""):
+    if isinstance(attr, AttrSpec):
+        attribute, value = attr.parsed
+    else:
+        attribute, value = parse_attr_spec(attr)
+    return _add_operations(field, ((process, prefix + attribute, value),))
+
+
+def _set_value(widget, attrs, attribute, value):  # pylint: disable=unused-argument
+    attrs[attribute] = value
+
+
+# attributes holding a space-separated set of tokens, which are deduplicated
+# when appended to
+TOKEN_ATTRIBUTES = frozenset(
+    [
+        "class",
+        "rel",
+        "headers",
+        "aria-controls",
+        "aria-describedby",
+        "aria-labelledby",
+        "aria-owns",
+    ]
+)
+
+
+class ClassList:
+    """
+    Ordered set of the tokens of a space-separated attribute such as
+    ``class``. Appended and removed tokens are collected while the
+    operations are applied and the attribute is serialized once.
+    """
+
+    def __init__(self, value=""):
+        self._tokens = dict.fromkeys(str(value).split())
+
+    def add(self, value):
+        for token in str(value).split():
+            self._tokens[token] = None
+
+    def remove(self, value):
+        for token in str(value).split():
+            self._tokens.pop(token, None)
+
+    def __contains__(self, token):
+        return token in self._tokens
+
+    def __iter__(self):
+        return iter(self._tokens)
+
+    def __len__(self):
+        return len(self._tokens)
+
+    def __str__(self):
+        return " ".join(self._tokens)
+
+
+def _class_list(widget, attrs, attribute):
+    value = attrs.get(attribute)
+    if not isinstance(value, ClassList):
+        value = ClassList(value or widget.attrs.get(attribute) or "")
         attrs[attribute] = value
+    return value
+
+
+def _serialize_class_lists(attrs):
+    """
+    Replace class lists in ``attrs`` by their string value, dropping the
+    ones left empty. Return the names of the dropped attributes.
+    """
+    emptied = set()
+    for attribute, value in list(attrs.items()):
+        if isinstance(value, ClassList):
+            if value:
+                attrs[attribute] = str(value)
+            else:
+                del attrs[attribute]
+                emptied.add(attribute)
+    return emptied
+
+
+def _append_value(widget, attrs, attribute, value):
+    if attribute in TOKEN_ATTRIBUTES:
+        _class_list(widget, attrs, attribute).add(value)
+    elif attrs.get(attribute):
+        attrs[attribute] += " " + value
+    elif widget.attrs.get(attribute):
+        attrs[attribute] = widget.attrs[attribute] + " " + value
+    else:
+        attrs[attribute] = value
+
+
+def _set_default(widget, attrs, attribute, value):
+    # defaults are added to token attributes such as class, and
+    # never override other attributes set on the widget
+    if attribute in TOKEN_ATTRIBUTES:
+        _append_value(widget, attrs, attribute, value)
+    elif attribute not in attrs and attribute not in widget.attrs:
+        attrs[attribute] = value
+
 
-    return _process_field_attributes(field, attr, process)
+def _remove_token(widget, attrs, attribute, value):
+    _class_list(widget, attrs, attribute).remove(value)
+
+
+def _remove_value(widget, attrs, attribute, value):  # pylint: disable=unused-argument
+    # removals are applied to a copy of the widget before other operations
+    pass
+
+
+def _update_values(widget, attrs, attribute, values):  # pylint: disable=unused-argument
+    attrs.update(values)
+
+
+@register.filter("attr")
+@silence_without_field(name="attr")
+def set_attr(field, attr):
+    return _process_field_attributes(field, attr, _set_value)
 
 
 @register.filter("add_error_attr")
-@silence_without_field
+@silence_without_field(name="add_error_attr")
 def add_error_attr(field, attr):
     if hasattr(field, "errors") and field.errors:
-        return set_attr(field, attr)
+        return _process_field_attributes(field, attr, _set_value)
     return field
 
 
 @register.filter("append_attr")
-@silence_without_field
+@silence_without_field(name="append_attr")
 def append_attr(field, attr):
-    def process(widget, attrs, attribute, value):
-        if attrs.get(attribute):
-            attrs[attribute] += " " + value
-        elif widget.attrs.get(attribute):
-            attrs[attribute] = widget.attrs[attribute] + " " + value
-        else:
-            attrs[attribute] = value
-
-    return _process_field_attributes(field, attr, process)
+    return _process_field_attributes(field, attr, _append_value)
 
 
 @register.filter("add_class")
-@silence_without_field
+@silence_without_field(name="add_class")
 def add_class(field, css_class):
-    return append_attr(field, "class:" + css_class)
+    return _process_field_attributes(field, "class:" + css_class, _append_value)
+
+
+@register.filter("remove_class")
+@silence_without_field(name="remove_class")
+def remove_class(field, css_class):
+    return _process_field_attributes(field, "class:" + css_class, _remove_token)
 
 
 @register.filter("add_label_class")
-@silence_without_field
+@silence_without_field(name="add_label_class")
 def add_label_class(field, css_class):
     return field.label_tag(attrs={"class": css_class})
 
 
 @register.filter("add_error_class")
-@silence_without_field
+@silence_without_field(name="add_error_class")
 def add_error_class(field, css_class):
     if hasattr(field, "errors") and field.errors:
-        return add_class(field, css_class)
+        return _process_field_attributes(field, "class:" + css_class, _append_value)
     return field
 
 
 @register.filter("add_required_class")
-@silence_without_field
+@silence_without_field(name="add_required_class")
 def add_required_class(field, css_class):
     if hasattr(field.field, "required") and field.field.required:
-        return add_class(field, css_class)
+        return _process_field_attributes(field, "class:" + css_class, _append_value)
     return field
 
 
 @register.filter("set_data")
-@silence_without_field
+@silence_without_field(name="set_data")
 def set_data(field, data):
-    return set_attr(field, "data-" + data)
+    return _process_field_attributes(field, data, _set_value, prefix="data-")
+
+
+@lru_cache(maxsize=None)
+def _class_name(cls):
+    return cls.__name__.lower()
 
 
 @register.filter(name="field_type")
@@ -128,7 +847,7 @@ def field_type(field):
     return 'charfield'.
     """
     if hasattr(field, "field") and field.field:
-        return field.field.__class__.__name__.lower()
+        return _class_name(field.field.__class__)
     return ""
 
 
@@ -144,32 +863,131 @@ def widget_type(field):
         and hasattr(field.field, "widget")
         and field.field.widget
     ):
-        return field.field.widget.__class__.__name__.lower()
+        return _class_name(field.field.widget.__class__)
     return ""
 
 
-# ======================== render_field tag ==============================
+FieldInfo = namedtuple(
+    "FieldInfo",
+    ["field_type", "widget_type", "required", "multipart", "input_type", "is_hidden"],
+)
 
-ATTRIBUTE_RE = re.compile(
-    r"""
-    (?P<attr>
-        [@\w:_\.-]+
-    )
-    (?P<sign>
-        \+?=
+
+@register.filter(name="field_info")
+def field_info(field):
+    """
+    Template filter that returns a description of the field to branch on
+    in templates without probing the field again and again:
+    ``field_type`` and ``widget_type`` (as returned by the filters of the same
+    name), ``required``, ``multipart`` (the widget needs a multipart form),
+    ``input_type`` (the widget's input type, e.g. 'text', if any) and
+    ``is_hidden``.
+    E.g. {% with info=field|field_info %}{% if info.multipart %}...
+    """
+    if not (hasattr(field, "field") and field.field):
+        return ""
+    widget = getattr(field.field, "widget", None)
+    if not widget:
+        return FieldInfo(
+            _class_name(field.field.__class__),
+            "",
+            field.field.required,
+            False,
+            "",
+            False,
+        )
+    return FieldInfo(
+        _class_name(field.field.__class__),
+        _class_name(widget.__class__),
+        field.field.required,
+        widget.needs_multipart_form,
+        getattr(widget, "input_type", "") or "",
+        widget.is_hidden,
     )
-    (?P<value>
-    ['"]? # start quote
-        [^"']*
-    ['"]? # end quote
+
+
+# ======================== render_field tag ==============================
+
+ATTRIBUTE_NAME_CHARS = frozenset("@:_.-")
+
+
+def _split_attribute(pair):
+    """
+    Split an ``attr=value`` or ``attr+=value`` tag argument into
+    (attribute, sign, value), or return None if it is malformed.
+    """
+    eq = pair.find("=")
+    if eq <= 0:
+        return None
+    attr, sign = pair[:eq], "="
+    if attr[-1] == "+":
+        attr, sign = attr[:-1], "+="
+    if not attr or not all(c.isalnum() or c in ATTRIBUTE_NAME_CHARS for c in attr):
+        return None
+    return attr, sign, pair[eq + 1 :]
+
+
+def _parse_attributes(compile_filter, attr_list, error_msg):
+    """
+    Parse ``attr="value"`` and ``attr+="value"`` tag arguments into lists
+    of (attribute, FilterExpression) pairs to set and to append.
+    """
+    set_attrs = []
+    append_attrs = []
+    for pair in attr_list:
+        split = _split_attribute(pair)
+        if split is None:
+            raise TemplateSyntaxError(error_msg + f": {pair}")
+        attr, sign, value = split
+        attr = attr.replace("::", ":")
+        if attr.startswith(SUBWIDGET_PREFIX) and attr.count(".") < 2:
+            raise TemplateSyntaxError(error_msg + f": {pair}")
+        if sign == "=":
+            set_attrs.append((attr, compile_filter(value)))
+        else:
+            append_attrs.append((attr, compile_filter(value)))
+    return set_attrs, append_attrs
+
+
+def _compile_render_field(compile_filter, contents):
+    bits = Token(TokenType.BLOCK, contents).split_contents()
+    error_msg = (
+        f"{bits[0]!r} tag requires a form field followed by "
+        'a list of attributes and values in the form attr="value"'
     )
-""",
-    re.VERBOSE | re.UNICODE,
+    if len(bits) < 2:
+        raise TemplateSyntaxError(error_msg)
+    form_field = compile_filter(bits[1])
+    set_attrs, append_attrs = _parse_attributes(compile_filter, bits[2:], error_msg)
+    return form_field, set_attrs, append_attrs, AttributePlan(set_attrs, append_attrs)
+
+
+def _compile_render_field_without_filters(contents):
+    # template filters depend on the libraries loaded by the template,
+    # so only tags without filters are compiled independently of the parser
+    return _compile_render_field(lambda bit: FilterExpression(bit, None), contents)
+
+
+compile_render_field_cached = _lru_cached(
+    _compile_render_field_without_filters,
+    "WIDGET_TWEAKS_PARSE_CACHE_SIZE",
+    PARSE_CACHE_SIZE,
 )
 
 
+@receiver(setting_changed)
+def _reset_caches(setting, **kwargs):  # pylint: disable=unused-argument
+    global parse_attr_spec, compile_render_field_cached  # pylint: disable=global-statement
+    if setting == "WIDGET_TWEAKS_ATTR_SPEC_CACHE_SIZE":
+        parse_attr_spec = _lru_cached(_parse_attr_spec, setting, ATTR_SPEC_CACHE_SIZE)
+    elif setting == "WIDGET_TWEAKS_PARSE_CACHE_SIZE":
+        compile_render_field_cached = _lru_cached(
+            _compile_render_field_without_filters, setting, PARSE_CACHE_SIZE
+        )
+
+
 @register.tag
-def render_field(parser, token):  # pylint: disable=too-many-locals
+def render_field(parser, token):
     """
     Render a form field using given attribute-value pairs
 
@@ -178,73 +996,514 @@ def render_field(parser, token):  # pylint: disable=too-many-locals
     attribute=value or attribute="a value" for assignment and attribute+=value
     or attribute+="value" for appending.
     """
-    error_msg = (
-        f"{token.split_contents()[0]!r} tag requires a form field followed by "
-        'a list of attributes and values in the form attr="value"'
+    # identical tags without filters (and translated strings) are parsed once
+    if "|" in token.contents or "_(" in token.contents:
+        compiled = _compile_render_field(parser.compile_filter, token.contents)
+    else:
+        compiled = compile_render_field_cached(token.contents)
+    form_field, set_attrs, append_attrs, plan = compiled
+    return FieldAttributeNode(form_field, set_attrs, append_attrs, plan)
+
+
+def _is_literal(filter_expression):
+    """
+    Return True if ``filter_expression`` is a constant (a quoted string or
+    a number without filters) whose value does not depend on the context.
+    """
+    if filter_expression.filters:
+        return False
+    var = filter_expression.var
+    if not isinstance(var, Variable):
+        return True
+    return var.literal is not None and not var.translate
+
+
+def _plain_str(value):
+    """
+    Return ``value`` as a plain str, dropping ``SafeString``: attribute
+    values are always escaped, like the ones of the attr filter.
+    """
+    # str.__str__() returns a plain str for str subclasses
+    return str.__str__(str(value))
+
+
+def _literal_value(filter_expression):
+    var = filter_expression.var
+    # Django marks template string literals safe
+    return _pre_escaped(_plain_str(var.literal if isinstance(var, Variable) else var))
+
+
+def _pre_escaped(value):
+    """
+    Mark literal attribute values that escaping leaves unchanged as safe,
+    so that they aren't escaped again on every render.
+    """
+    if isinstance(value, str) and not isinstance(value, SafeData):
+        if escape(value) == value:
+            return mark_safe(value)
+    return value
+
+
+def attribute_operations(values, append_values):
+    """
+    Return the operations setting the ``values`` dict and appending the
+    (attribute, value) pairs of ``append_values``.
+    """
+    operations = ((_update_values, None, values),) if values else ()
+    return operations + tuple(
+        (_append_value, attr, value) for attr, value in append_values
     )
-    try:
-        bits = token.split_contents()
-        tag_name = bits[0]  # noqa
-        form_field = bits[1]
-        attr_list = bits[2:]
-    except ValueError as exc:
-        raise TemplateSyntaxError(error_msg) from exc
 
-    form_field = parser.compile_filter(form_field)
 
-    set_attrs = []
-    append_attrs = []
-    for pair in attr_list:
-        match = ATTRIBUTE_RE.match(pair)
-        if not match:
-            raise TemplateSyntaxError(error_msg + f": {pair}")
-        dct = match.groupdict()
-        attr, sign, value = (
-            dct["attr"],
-            dct["sign"],
-            parser.compile_filter(dct["value"]),
+class AttributePlan:
+    """
+    Attributes of a ``render_field``-like tag compiled when the template is
+    parsed.
+
+    Literal values are resolved once and only ``FilterExpression`` values
+    that depend on the context are resolved on render. The resolved
+    attributes are handed to the field as operations directly, without
+    being formatted into 'attr:value' filter arguments. When all the
+    values are literals, the whole list of operations is precomputed and
+    rendering merges a read-only attributes dict into the widget attrs.
+    """
+
+    def __init__(self, set_attrs, append_attrs):
+        # with repeated attributes the first assignment wins,
+        # the same as for chained filters
+        self.static_set_attrs = {}
+        self.dynamic_set_attrs = []
+        seen = set()
+        for attr, value in set_attrs:
+            if attr in seen:
+                continue
+            seen.add(attr)
+            if _is_literal(value):
+                self.static_set_attrs[attr] = _literal_value(value)
+            else:
+                self.dynamic_set_attrs.append((attr, value))
+        self.append_plan = [
+            (
+                (attr, _literal_value(value), None)
+                if _is_literal(value)
+                else (attr, None, value)
+            )
+            for attr, value in append_attrs
+        ]
+        # fully literal tags get their operations precomputed once
+        self.static_operations = None
+        if not self.dynamic_set_attrs and all(
+            filter_expression is None for _, _, filter_expression in self.append_plan
+        ):
+            self.static_operations = self._operations(
+                MappingProxyType(self.static_set_attrs), self.append_plan
+            )
+
+    @staticmethod
+    def _operations(values, append_plan):
+        return attribute_operations(
+            values, [(attr, value) for attr, value, _ in append_plan]
         )
-        if sign == "=":
-            set_attrs.append((attr, value))
-        else:
-            append_attrs.append((attr, value))
 
-    return FieldAttributeNode(form_field, set_attrs, append_attrs)
+    def resolve(self, context):
+        """
+        Return the operations of this plan with values resolved in ``context``.
+        """
+        if self.static_operations is not None:
+            return self.static_operations
+        values = dict(self.static_set_attrs)
+        for attr, value in self.dynamic_set_attrs:
+            values[attr] = _plain_str(value.resolve(context))
+        append_plan = [
+            (
+                (attr, value, None)
+                if filter_expression is None
+                else (attr, _plain_str(filter_expression.resolve(context)), None)
+            )
+            for attr, value, filter_expression in self.append_plan
+        ]
+        return self._operations(values, append_plan)
+
+
+WIDGET_ATTRS_POLICY_KEY = "widget_tweaks.widget_attrs"
+
+
+def _widget_context(context):
+    """
+    Return the ``WIDGET_ERROR_CLASS`` and ``WIDGET_REQUIRED_CLASS`` context
+    variables and the innermost ``widget_attrs`` policy (None when not
+    set), looked up in a single walk of the context stack. Variables can be
+    rebound between tags (e.g. by ``{% firstof ... as ... %}`` in a loop),
+    so the walk is done for every tag.
+    """
+    error_class = required_class = policy = None
+    found_error_class = found_required_class = found_policy = False
+    for dct in reversed(context.dicts):
+        if not found_error_class and "WIDGET_ERROR_CLASS" in dct:
+            error_class, found_error_class = dct["WIDGET_ERROR_CLASS"], True
+        if not found_required_class and "WIDGET_REQUIRED_CLASS" in dct:
+            required_class, found_required_class = dct["WIDGET_REQUIRED_CLASS"], True
+        if not found_policy and WIDGET_ATTRS_POLICY_KEY in dct:
+            policy, found_policy = dct[WIDGET_ATTRS_POLICY_KEY], True
+        if found_error_class and found_required_class and found_policy:
+            break
+    return error_class, required_class, policy
+
+
+def _policy_operations(policy, bounded_field):
+    if policy is None:
+        return ()
+    return policy.operations(widget_type(bounded_field))
 
 
 class FieldAttributeNode(Node):
-    def __init__(self, field, set_attrs, append_attrs):
+    def __init__(
+        self, field, set_attrs, append_attrs, plan=None
+    ):  # pylint: disable=too-many-arguments
         self.field = field
         self.set_attrs = set_attrs
         self.append_attrs = append_attrs
+        self.plan = plan or AttributePlan(set_attrs, append_attrs)
 
     def render(self, context):
         bounded_field = self.field.resolve(context)
+        error_class, required_class, policy = _widget_context(context)
+        return render_field_html(
+            bounded_field,
+            self.plan.resolve(context) + _policy_operations(policy, bounded_field),
+            error_class,
+            required_class,
+        )
+
+
+def render_field_html(bounded_field, operations, error_class=None, required_class=None):
+    """
+    Render ``bounded_field`` like the ``render_field`` tag, with the
+    attribute ``operations`` and the error and required classes.
+    """
+    widget_classes = ()
+    # field errors are only looked up when an error class is set, as
+    # accessing them triggers validation of bound forms
+    if error_class is not None and getattr(bounded_field, "errors", None):
+        widget_classes += ((_append_value, "class", str(error_class)),)
+    if required_class is not None:
         field = getattr(bounded_field, "field", None)
-        if getattr(bounded_field, "errors", None) and "WIDGET_ERROR_CLASS" in context:
-            bounded_field = append_attr(
-                bounded_field, f'class:{context["WIDGET_ERROR_CLASS"]}'
-            )
-        if field and field.required and "WIDGET_REQUIRED_CLASS" in context:
-            bounded_field = append_attr(
-                bounded_field, f"class:{context['WIDGET_REQUIRED_CLASS']}"
-            )
-        for k, v in self.set_attrs:
-            if k == "type":
-                bounded_field.field.widget.input_type = v.resolve(context)
-            else:
-                bounded_field = set_attr(bounded_field, f"{k}:{v.resolve(context)}")
-        for k, v in self.append_attrs:
-            bounded_field = append_attr(bounded_field, f"{k}:{v.resolve(context)}")
+        if field and field.required:
+            widget_classes += ((_append_value, "class", str(required_class)),)
+    operations = widget_classes + operations
+    if (
+        not operations
+        and get_render_cache() is None
+        and get_options_cache() is None
+        and get_default_attrs() is None
+    ):
         return str(bounded_field)
+    if not bounded_field:
+        return ""
+    return _render_tweaked_field(
+        _add_operations(bounded_field, operations), "render_field"
+    )
+
+
+# ======================== render_fields tag ==============================
+
+
+@register.tag
+def render_fields(parser, token):
+    """
+    Render several form fields sharing the same attribute-value pairs.
+
+    Takes a form (or any iterable of bound fields) as first argument and the
+    attribute-value pairs of ``render_field`` for all other arguments. The
+    tag content is rendered for each field with the tweaked field available
+    as ``field``; an empty content renders the fields one after another.
+    Attributes of single fields can be overridden with ``field_override``
+    tags placed inside the block::
+
+        {% render_fields form class+="form-control" %}
+            {% field_override "email" type="email" %}
+            <div>{{ field.label_tag }} {{ field }}</div>
+        {% endrender_fields %}
+    """
+    bits = token.split_contents()
+    error_msg = (
+        f"{bits[0]!r} tag requires a form or a list of fields followed by "
+        'a list of attributes and values in the form attr="value"'
+    )
+    if len(bits) < 2:
+        raise TemplateSyntaxError(error_msg)
+    fields = parser.compile_filter(bits[1])
+    set_attrs, append_attrs = _parse_attributes(
+        parser.compile_filter, bits[2:], error_msg
+    )
+    nodelist = parser.parse((f"end{bits[0]}",))
+    parser.delete_first_token()
+    return FieldsAttributeNode(fields, set_attrs, append_attrs, nodelist)
+
+
+@register.tag
+def field_override(parser, token):
+    """
+    Override attributes of a single field inside ``render_fields``. Takes
+    the field name followed by attribute-value pairs.
+    """
+    bits = token.split_contents()
+    error_msg = (
+        f"{bits[0]!r} tag requires a field name followed by "
+        'a list of attributes and values in the form attr="value"'
+    )
+    if len(bits) < 2:
+        raise TemplateSyntaxError(error_msg)
+    name = parser.compile_filter(bits[1])
+    set_attrs, append_attrs = _parse_attributes(
+        parser.compile_filter, bits[2:], error_msg
+    )
+    return FieldOverrideNode(name, set_attrs, append_attrs)
+
+
+class FieldOverrideNode(Node):
+    def __init__(self, name, set_attrs, append_attrs):
+        self.name = name
+        self.plan = AttributePlan(set_attrs, append_attrs)
+
+    def render(self, context):
+        return ""
+
+
+class FieldsAttributeNode(Node):
+    child_nodelists = ("nodelist",)
+
+    def __init__(self, fields, set_attrs, append_attrs, nodelist):
+        self.fields = fields
+        self.plan = AttributePlan(set_attrs, append_attrs)
+        self.nodelist = nodelist
+        self.overrides = nodelist.get_nodes_by_type(FieldOverrideNode)
+        # a content made of overrides and whitespace only renders the fields
+        self.render_content = any(
+            not isinstance(node, FieldOverrideNode)
+            and not (isinstance(node, TextNode) and not node.s.strip())
+            for node in nodelist
+        )
+
+    source = "render_fields"
+
+    def iter_fields(self, fields, context):  # pylint: disable=unused-argument
+        """
+        Yield (bound field, extra context) pairs to render.
+        """
+        for bounded_field in fields:
+            yield bounded_field, {}
+
+    def iter_render(self, context):
+        """
+        Yield the rendered output field by field.
+        """
+        fields = self.fields.resolve(context)
+        if not fields:
+            return
+        # context lookups, attribute values and overrides are resolved once
+        # for the whole block
+        error_class, required_class, policy = _widget_context(context)
+        shared_operations = self.plan.resolve(context)
+        overrides = {}
+        for override in self.overrides:
+            name = str(override.name.resolve(context))
+            overrides[name] = overrides.get(name, ()) + override.plan.resolve(context)
+
+        for bounded_field, extra_context in self.iter_fields(fields, context):
+            operations = ()
+            if error_class is not None and bounded_field.errors:
+                operations += ((_append_value, "class", str(error_class)),)
+            if required_class is not None and bounded_field.field.required:
+                operations += ((_append_value, "class", str(required_class)),)
+            operations += overrides.get(bounded_field.name, ())
+            operations += shared_operations
+            operations += _policy_operations(policy, bounded_field)
+            tweaked_field = _add_operations(bounded_field, operations)
+            if not self.render_content:
+                yield _render_tweaked_field(tweaked_field, self.source)
+                continue
+            with context.push(extra_context, field=tweaked_field):
+                yield self.nodelist.render(context)
+
+    def render(self, context):
+        return "".join(self.iter_render(context))
+
+
+# ======================== render_formset tag ==============================
+
+
+@register.tag
+def render_formset(parser, token):
+    """
+    Render the same field of every form of a formset.
+
+    Takes a formset and a field name followed by the attribute-value pairs of
+    ``render_field``. The attributes are compiled once and shared by all the
+    forms. The tag content is rendered for each form with the form available
+    as ``form`` and its tweaked field as ``field``; an empty content renders
+    the fields one after another::
+
+        {% render_formset formset "title" class+="form-control" %}
+            <tr><td>{{ form.id }}{{ field }}</td></tr>
+        {% endrender_formset %}
+    """
+    bits = token.split_contents()
+    error_msg = (
+        f"{bits[0]!r} tag requires a formset and a field name followed by "
+        'a list of attributes and values in the form attr="value"'
+    )
+    if len(bits) < 3:
+        raise TemplateSyntaxError(error_msg)
+    formset = parser.compile_filter(bits[1])
+    name = parser.compile_filter(bits[2])
+    set_attrs, append_attrs = _parse_attributes(
+        parser.compile_filter, bits[3:], error_msg
+    )
+    nodelist = parser.parse((f"end{bits[0]}",))
+    parser.delete_first_token()
+    return FormsetFieldAttributeNode(formset, name, set_attrs, append_attrs, nodelist)
+
+
+class FormsetFieldAttributeNode(FieldsAttributeNode):
+    source = "render_formset"
+
+    def __init__(
+        self, formset, name, set_attrs, append_attrs, nodelist
+    ):  # pylint: disable=too-many-arguments
+        super().__init__(formset, set_attrs, append_attrs, nodelist)
+        self.name = name
+
+    def iter_fields(self, fields, context):
+        name = str(self.name.resolve(context))
+        for form in fields:
+            try:
+                bounded_field = form[name]
+            except KeyError:
+                # missing fields render nothing, like for render_field
+                continue
+            yield bounded_field, {"form": form}
+
+
+# ======================== widget_attrs tag ==============================
+
+
+@register.tag
+def widget_attrs(parser, token):
+    """
+    Set attributes of all the fields rendered with ``render_field``,
+    ``render_fields`` and ``render_formset`` inside the block.
+
+    Takes an optional ``for`` followed by widget types (as returned by the
+    ``widget_type`` filter) the attributes are restricted to, and the
+    attribute-value pairs of ``render_field``. ``error_class`` and
+    ``required_class`` set the ``WIDGET_ERROR_CLASS`` and
+    ``WIDGET_REQUIRED_CLASS`` variables for the block::
+
+        {% widget_attrs class+="form-control" error_class="is-invalid" %}
+            {% widget_attrs for "select" "selectmultiple" class+="form-select" %}
+                ...
+            {% endwidget_attrs %}
+        {% endwidget_attrs %}
+    """
+    bits = token.split_contents()
+    error_msg = (
+        f"{bits[0]!r} tag requires an optional 'for' followed by widget types "
+        'and a list of attributes and values in the form attr="value"'
+    )
+    widget_types = []
+    attr_list = bits[1:]
+    if attr_list and attr_list[0] == "for":
+        attr_list = attr_list[1:]
+        while attr_list and "=" not in attr_list[0]:
+            widget_types.append(parser.compile_filter(attr_list.pop(0)))
+        if not widget_types:
+            raise TemplateSyntaxError(error_msg)
+    set_attrs, append_attrs = _parse_attributes(
+        parser.compile_filter, attr_list, error_msg
+    )
+    classes = {}
+    for name in ("error_class", "required_class"):
+        for attr, value in set_attrs:
+            if attr == name:
+                classes.setdefault(name, value)
+    set_attrs = [(attr, value) for attr, value in set_attrs if attr not in classes]
+    nodelist = parser.parse(("endwidget_attrs",))
+    parser.delete_first_token()
+    return WidgetAttrsNode(
+        widget_types,
+        classes.get("error_class"),
+        classes.get("required_class"),
+        AttributePlan(set_attrs, append_attrs),
+        nodelist,
+    )
+
+
+class AttributePolicy:
+    """
+    Attribute operations of a ``widget_attrs`` block, resolved once when the
+    block is rendered. The operations of each widget type, including the
+    ones of the enclosing blocks, are computed once per block.
+    """
+
+    def __init__(self, parent, widget_types, operations):
+        self.parent = parent
+        self.widget_types = widget_types
+        self._operations = operations
+        self._by_widget_type = {}
+
+    def operations(self, widget_type_name):
+        """
+        Return the operations applying to fields with the given widget type.
+        """
+        try:
+            return self._by_widget_type[widget_type_name]
+        except KeyError:
+            pass
+        operations = ()
+        # inner blocks win over enclosing ones
+        if not self.widget_types or widget_type_name in self.widget_types:
+            operations = self._operations
+        if self.parent is not None:
+            operations += self.parent.operations(widget_type_name)
+        self._by_widget_type[widget_type_name] = operations
+        return operations
+
+
+class WidgetAttrsNode(Node):
+    child_nodelists = ("nodelist",)
+
+    def __init__(
+        self, widget_types, error_class, required_class, plan, nodelist
+    ):  # pylint: disable=too-many-arguments
+        self.widget_types = widget_types
+        self.error_class = error_class
+        self.required_class = required_class
+        self.plan = plan
+        self.nodelist = nodelist
+
+    def render(self, context):
+        policy = AttributePolicy(
+            _widget_context(context)[2],
+            frozenset(
+                str(widget_type.resolve(context)).lower()
+                for widget_type in self.widget_types
+            ),
+            self.plan.resolve(context),
+        )
+        values = {WIDGET_ATTRS_POLICY_KEY: policy}
+        if self.error_class is not None:
+            values["WIDGET_ERROR_CLASS"] = self.error_class.resolve(context)
+        if self.required_class is not None:
+            values["WIDGET_REQUIRED_CLASS"] = self.required_class.resolve(context)
+        with context.push(values):
+            return self.nodelist.render(context)
 
 
 # ======================== remove_attr tag ==============================
 
 
 @register.filter("remove_attr")
-@silence_without_field
+@silence_without_field(name="remove_attr")
 def remove_attr(field, attr):
-    if attr in field.field.widget.attrs:
-        del field.field.widget.attrs[attr]
-    return field
+    return _add_operations(field, ((_remove_value, attr, None),))
@@ -0,0 +1,128 @@
+"""
+Compile the templates using widget_tweaks ahead of the first requests, e.g.
+in a gunicorn ``post_fork`` hook::
+
+    def post_fork(server, worker):
+        import django
+
+        django.setup()
+
+        from widget_tweaks.warmup import warm_up
+
+        warm_up()
+
+Templates are found through the loaders of the Django template engines and
+compiled with ``Engine.get_template()``, so they are kept by a cached
+loader (Django's default). The attribute spec cache is filled with the
+literal filter arguments of the compiled templates, and the parse cache of
+``render_field`` with their tags.
+
+The same is available as the ``widget_tweaks_warmup`` management command.
+"""
+
+import os
+import re
+from collections import namedtuple
+from time import perf_counter
+
+from django.template import TemplateDoesNotExist, engines
+from django.template.backends.django import DjangoTemplates
+
+from widget_tweaks.loaders import SPEC_FILTERS, iter_filter_expressions
+from widget_tweaks.templatetags import widget_tweaks
+
+LOAD_RE = re.compile(r"{%\s*load\s[^%]*\bwidget_tweaks\b[^%]*%}")
+
+WarmupResult = namedtuple("WarmupResult", ["name", "duration", "error"])
+
+
+def _loader_sources(loader, charset):
+    """
+    Yield (template name, source) pairs of the templates of ``loader``.
+    """
+    if hasattr(loader, "loaders"):  # cached loaders
+        for child in loader.loaders:
+            yield from _loader_sources(child, charset)
+    elif hasattr(loader, "templates_dict"):  # locmem loader
+        yield from loader.templates_dict.items()
+    elif hasattr(loader, "get_dirs"):
+        for directory in loader.get_dirs():
+            directory = str(directory)
+            for root, _, files in os.walk(directory):
+                for filename in sorted(files):
+                    path = os.path.join(root, filename)
+                    name = os.path.relpath(path, directory).replace(os.sep, "/")
+                    try:
+                        with open(path, encoding=charset) as fp:
+                            yield name, fp.read()
+                    except (OSError, UnicodeDecodeError):
+                        continue
+
+
+def _get_engines(engine=None):
+    if engine is not None:
+        return [engine]
+    return [
+        backend.engine
+        for backend in engines.all()
+        if isinstance(backend, DjangoTemplates)
+    ]
+
+
+def find_templates(engine=None):
+    """
+    Return the names of the templates loading the widget_tweaks library,
+    for the given ``django.template.Engine`` or all the Django template
+    engines.
+    """
+    names = []
+    for template_engine in _get_engines(engine):
+        for loader in template_engine.template_loaders:
+            for name, source in _loader_sources(loader, template_engine.file_charset):
+                if name not in names and LOAD_RE.search(source):
+                    names.append(name)
+    return names
+
+
+def _fill_attr_spec_cache(template):
+    for filter_expression in iter_filter_expressions(template):
+        for func, args in filter_expression.filters:
+            if func not in SPEC_FILTERS or len(args) != 1:
+                continue
+            lookup, arg = args[0]
+            # arguments pre-parsed by widget_tweaks.loaders are passed to
+            # the filters as they are and never looked up in the cache
+            if not lookup and isinstance(arg, str):
+                if not isinstance(arg, widget_tweaks.AttrSpec):
+                    widget_tweaks.parse_attr_spec(arg)
+
+
+def warm_up(template_names=None, engine=None):
+    """
+    Compile ``template_names`` (by default the templates found by
+    ``find_templates``) with the given ``django.template.Engine`` or the
+    first Django template engine that finds them. Return a list of
+    ``WarmupResult(name, duration, error)``, with the compile time in
+    seconds and the exception raised, if any.
+    """
+    template_engines = _get_engines(engine)
+    if template_names is None:
+        template_names = find_templates(engine)
+    results = []
+    for name in template_names:
+        start = perf_counter()
+        error = None
+        for template_engine in template_engines:
+            try:
+                template = template_engine.get_template(name)
+            except TemplateDoesNotExist as e:
+                error = e  # tried with the next engine
+                continue
+            except Exception as e:  # pylint: disable=broad-except
+                error = e
+                break
+            error = None
+            _fill_attr_spec_cache(template)
+            break
+        results.append(WarmupResult(name, perf_counter() - start, error))
+    return results